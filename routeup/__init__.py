@@ -6,20 +6,24 @@
 #
 """**Top level variables**."""
 
-from importlib.metadata import PackageNotFoundError, version
-
 try:
-    __version__ = version(__name__)
-    """Package version.
+    from ._version import __version__
+except ImportError:
+    # No version module written at build time, read the package metadata.
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        __version__ = version(__name__)
+        """Package version.
 
-    This string contains the package version and can be imported as:
+        This string contains the package version and can be imported as:
 
-    .. doctest::
+        .. doctest::
 
-        >>> from routeup import __version__
+            >>> from routeup import __version__
 
-    """
-except PackageNotFoundError:
-    pass
+        """
+    except PackageNotFoundError:
+        __version__ = "0+unknown"
 
 __all__ = ["__version__"]
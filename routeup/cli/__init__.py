@@ -27,14 +27,11 @@ There is a special :func:`.main_callback` which enables the
 
 import sys
 
-import rich
 import typer
-from rich.panel import Panel
-from typer import Option, Typer
 
 from routeup import __version__
 
-app = Typer()
+app = typer.Typer()
 """Main Typer application.
 
 This is the CLI entrypoint. It has one single ``--version`` option,
@@ -45,11 +42,17 @@ current installed version of ``routeup``.
 
 
 @app.callback(invoke_without_command=True, no_args_is_help=True)
-def main_callback(version: bool = Option(False, help="Show the package version.")):
+def main_callback(
+    version: bool = typer.Option(False, help="Show the package version."),
+):
     """Routeup command line interface."""
     _v = __version__
     _p = sys.platform.capitalize()
     if version is not None:
+        # Rich is only needed to display the version, import it lazily.
+        import rich
+        from rich.panel import Panel
+
         rich.print(
             Panel.fit(
                 f"RouteUp, version {_v} on {_p}",
@@ -59,8 +62,20 @@ def main_callback(version: bool = Option(False, help="Show the package version."
         )
 
 
-typer_click_object = typer.main.get_command(app)
-"""Main Click object derived from the main Typer app."""
+def __getattr__(name: str):
+    """Build module attributes lazily.
+
+    ``typer_click_object`` is the main Click object derived from the
+    main Typer app. Converting the app to Click is only needed by
+    tools that consume the Click command (e.g. documentation), so it
+    is built on first access and then cached in the module.
+
+    """
+    if name == "typer_click_object":
+        typer_click_object = typer.main.get_command(app)
+        globals()[name] = typer_click_object
+        return typer_click_object
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     app()
@@ -41,27 +41,37 @@ Finally, to override any of the environmental configuration defined in
 be defined in the OS, with the same name of the configuration defined
 in the config class, and prefixed with the :obj:`.ENV_PREFIX`.
 
+The YAML file is parsed with PyYAML's ``CSafeLoader``,
+which requires the `libyaml <https://pyyaml.org/wiki/LibYAML>`_ system
+library (e.g. ``sudo apt install libyaml-dev`` before installing
+PyYAML). Without it we fall back to the pure-Python ``SafeLoader``.
+
 """
 
 from pathlib import Path
 from typing import Any, Type
 
+import driconfig
+import yaml
 from driconfig import DriConfig, DriConfigConfigDict
 from pydantic import DirectoryPath, Field
-from pydantic.functional_validators import field_validator
+from pydantic.functional_validators import model_validator
 from pydantic.type_adapter import TypeAdapter
-from pydantic_core.core_schema import ValidationInfo
 from pydantic_settings import (
     BaseSettings,
     PydanticBaseSettingsSource,
     SettingsConfigDict,
 )
-from typing_extensions import Annotated
 
 from ..types.pydantic import SQLiteDsn
 from .enums import DistanceMetric, Environment, LogLevel
 from .interfaces import LoggerOptions
 
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:  # pragma: nocover
+    from yaml import SafeLoader as _YAMLLoader  # type: ignore[assignment]
+
 ENV_PREFIX = "ROUTEUP"
 """Environment variables prefix for project configurations.
 
@@ -81,6 +91,60 @@ attribute with an environment variable, we should define:
 
 """
 
+_ROOT: Path = Path(__file__).resolve().parents[3]
+"""Project root folder."""
+
+_DIRECTORY_PATH_ADAPTER: TypeAdapter[DirectoryPath] = TypeAdapter(DirectoryPath)
+"""Shared validator for the data sub-folder paths."""
+
+_PATH_DATA_FIELDS = (
+    "PATH_DATA_DB",
+    "PATH_DATA_EXTERNAL",
+    "PATH_DATA_INTERIM",
+    "PATH_DATA_LOG",
+    "PATH_DATA_MODELS",
+    "PATH_DATA_PROCESSED",
+    "PATH_DATA_RAW",
+    "PATH_DATA_RESULTS",
+)
+"""Data sub-folders, relative to the data folder by default."""
+
+
+def _read_yaml_file(
+    file_path: Path,
+    *,
+    encoding: str | None = None,
+    case_sensitive: bool | None = False,
+    config_prefix: str | None = None,
+) -> dict[str, Any]:
+    """Parse a YAML configuration file using the libyaml loader.
+
+    Drop-in replacement of :func:`driconfig.read_yaml_file`, which
+    always uses the pure-Python ``SafeLoader``.
+
+    Args:
+        file_path: YAML configuration file path.
+        encoding: YAML configuration file encoding.
+        case_sensitive: Whether read variables case-sensitively.
+        config_prefix: YAML configuration prefix.
+
+    Returns: Parsed YAML configuration file.
+
+    """
+    with Path(file_path).open(encoding=encoding or "utf8") as f:
+        file_vars: dict[str, Any] = yaml.load(f, Loader=_YAMLLoader)
+    if config_prefix is not None:
+        file_vars = {k.replace(config_prefix, ""): v for k, v in file_vars.items()}
+    if not case_sensitive:
+        try:
+            return {k.lower(): v for k, v in file_vars.items()}
+        except AttributeError:
+            return file_vars
+    return file_vars
+
+
+driconfig.read_yaml_file = _read_yaml_file
+
 
 class AppConfig(DriConfig):
     """**Application configurations interface**.
@@ -182,7 +246,7 @@ class AppConfig(DriConfig):
         super().__init__()
 
     model_config = DriConfigConfigDict(
-        config_folder=Path(__file__).parents[2] / "config",
+        config_folder=_ROOT / "routeup" / "config",
         config_file_name="config.yaml",
     )
 
@@ -192,6 +256,8 @@ class AppConfig(DriConfig):
     """
     grid_search_time_limit: int
     """Time limit for grid search in seconds."""
+    validate_outputs: bool = False
+    """Validate the route optimizer outputs, which are otherwise trusted."""
 
 
 class GlobalConfig(BaseSettings):
@@ -224,7 +290,7 @@ class GlobalConfig(BaseSettings):
 
     model_config = SettingsConfigDict(
         case_sensitive=True,
-        env_file=Path(__file__).parents[3] / ".env",
+        env_file=_ROOT / ".env",
         env_prefix=f"{ENV_PREFIX}_",
         extra="ignore",
     )
@@ -241,7 +307,7 @@ class GlobalConfig(BaseSettings):
         """Modify sources preference wrt Pydantic defaults."""
         return env_settings, dotenv_settings, init_settings, file_secret_settings
 
-    APP_CONFIG: AppConfig = AppConfig()
+    APP_CONFIG: AppConfig = Field(default_factory=AppConfig)
     """Application configuration object containing the attributes read
     from the YAML config file.
     """
@@ -249,7 +315,7 @@ class GlobalConfig(BaseSettings):
     ENV: Environment = Environment.DEV
     """Application environment."""
 
-    PATH_DATA: DirectoryPath = Path(__file__).parents[3] / "data"
+    PATH_DATA: DirectoryPath = _ROOT / "data"
     """Path to the data folder."""
 
     PATH_DATA_DB: Path = Path("db")
@@ -269,25 +335,24 @@ class GlobalConfig(BaseSettings):
     PATH_DATA_RESULTS: Path = Path("results")
     """Path to the results data sub-folder."""
 
-    @field_validator(
-        "PATH_DATA_DB",
-        "PATH_DATA_EXTERNAL",
-        "PATH_DATA_INTERIM",
-        "PATH_DATA_LOG",
-        "PATH_DATA_MODELS",
-        "PATH_DATA_PROCESSED",
-        "PATH_DATA_RAW",
-        "PATH_DATA_RESULTS",
-    )
-    def dynamic_on_data_path(cls, v, info: ValidationInfo):
-        """Make data sub-folders dynamic on the data folder value."""
-        if v == cls.model_fields[info.field_name].default and "PATH_DATA" in info.data:
-            return TypeAdapter(DirectoryPath).validate_python(
-                info.data["PATH_DATA"] / v
-            )
-            # return DirectoryPath.validate(info.data["PATH_DATA"] / v)
-        return TypeAdapter(DirectoryPath).validate_python(v)
-        # return DirectoryPath.validate(v)
+    @model_validator(mode="after")
+    def dynamic_on_data_path(self):
+        """Make data sub-folders dynamic on the data folder value.
+
+        Every sub-folder is resolved in a single pass. Values are written
+        to the instance ``__dict__`` so that they are not marked as
+        explicitly set.
+        """
+        fields = type(self).model_fields
+        for name in _PATH_DATA_FIELDS:
+            v = getattr(self, name)
+            if isinstance(v, Path) and v.is_absolute() and v.is_dir():
+                # Already resolved (e.g. dumped from another config object).
+                continue
+            if v == fields[name].default:
+                v = self.PATH_DATA / v
+            self.__dict__[name] = _DIRECTORY_PATH_ADAPTER.validate_python(v)
+        return self
 
     LOG_LEVEL: LogLevel = LogLevel.INFO
     """Logging level."""
@@ -300,37 +365,42 @@ class GlobalConfig(BaseSettings):
     """Database name."""
     DATABASE_PATH: Path | None = None
     """Database path."""
-    DATABASE_URI: Annotated[SQLiteDsn | None, Field(validate_default=True)] = None
+    DATABASE_URI: SQLiteDsn | None = None
     """Database URI."""
 
-    @field_validator("DATABASE_PATH")
-    def dynamic_on_data_db_path(cls, v: Path | None, info: ValidationInfo) -> Path:
-        """Make the DB path dynamic on the data/db folder."""
-        if v is not None:
-            return v
-        return info.data.get("PATH_DATA_DB", Path(".")) / info.data["DATABASE_NAME"]
+    @model_validator(mode="after")
+    def dynamic_on_data_db_path(self):
+        """Make the DB path dynamic on the data/db folder.
 
-    @field_validator("DATABASE_URI")
-    def assemble_db_connection(cls, v: str | None, info: ValidationInfo) -> Any:
+        The path is made absolute here, once, so that the database URI
+        can be assembled directly from it.
+        """
+        if self.DATABASE_PATH is None:
+            db_path = self.PATH_DATA_DB / self.DATABASE_NAME
+        else:
+            db_path = self.DATABASE_PATH
+        self.__dict__["DATABASE_PATH"] = db_path.absolute()
+        return self
+
+    @model_validator(mode="after")
+    def assemble_db_connection(self):
         """Assemble the database connection URI."""
-        return (
-            v
-            if v
-            else SQLiteDsn.build(
+        if not self.DATABASE_URI:
+            self.__dict__["DATABASE_URI"] = SQLiteDsn.build(
                 scheme="sqlite",
                 host="/",
-                path=str(info.data["DATABASE_PATH"].absolute()),
+                path=str(self.DATABASE_PATH),
             )
-        )
+        return self
 
-    PATH_JSON_SCHEMA: Path = Path(__file__).parents[3] / "schemas_json"
+    PATH_JSON_SCHEMA: Path = Field(default_factory=lambda: _ROOT / "schemas_json")
     """Path to the JSON schema folder."""
     GCLOUD_PROJECT_ID: str = "brainer-390415"
     """BigQuery project ID."""
     GCLOUD_DATASET_ANALYTICS: str = "routeup"
     """BigQuery Analytics dataset name."""
-    GCLOUD_CREDENTIALS_PATH: Path = (
-        Path(__file__).parents[3] / "gcloud_brainer_credentials.json"
+    GCLOUD_CREDENTIALS_PATH: Path = Field(
+        default_factory=lambda: _ROOT / "gcloud_brainer_credentials.json"
     )
     """BigQuery Analytics dataset name."""
     # BIGQUERY_HTTP: str | None = None
@@ -339,7 +409,7 @@ class GlobalConfig(BaseSettings):
     """Valhalla API URL."""
     GOOGLE_MAPS_API_KEY: str = ""
     """Google Maps API key."""
-    DISTANCE_METRIC: str = DistanceMetric("meters")
+    DISTANCE_METRIC: DistanceMetric = DistanceMetric.METERS
     """Distance metric."""
     MAX_VEHICLES: int = 100
     """Max vehicles that can be introduced in a request."""
@@ -385,13 +455,26 @@ class UnitTestConfig(GlobalConfig):
     """The log level is set to :attr:`~.config.enums.LogLevel.TRACE`
     in the :attr:`~.config.enums.Environment.UNITTEST` environment.
     """
-    DATABASE_URI: SQLiteDsn = SQLiteDsn.build(scheme="sqlite", host="", path=":memory:")
+    DATABASE_URI: SQLiteDsn = Field(
+        default_factory=lambda: SQLiteDsn.build(
+            scheme="sqlite", host="", path=":memory:"
+        )
+    )
     """We use an in-memory SQLite database in the
     :attr:`~.config.enums.Environment.PRO` environment.
     """
     # BIGQUERY_HTTP: str = ""
 
 
+_ENV_CONFIG_CLASSES: dict[Environment, Type[GlobalConfig]] = {
+    Environment.DEV: DevConfig,
+    Environment.PRO: ProConfig,
+    Environment.PRE: PreConfig,
+    Environment.UNITTEST: UnitTestConfig,
+}
+"""Configuration class of each environment."""
+
+
 class FactoryConfig:
     """**Configuration factory**.
 
@@ -425,22 +508,20 @@ class FactoryConfig:
           environment.
 
         """
-        match self.env:
-            case Environment.DEV:
-                return DevConfig(**values)
-            case Environment.PRO:
-                return ProConfig(**values)
-            case Environment.UNITTEST:
-                return UnitTestConfig(**values)
-            case Environment.PRE:
-                return PreConfig(**values)
-            case _:
-                raise RuntimeError("Environment not recognized.")
-
-
-config = FactoryConfig(GlobalConfig().ENV)(
-    **GlobalConfig().model_dump(exclude_unset=True)
+        config_cls = _ENV_CONFIG_CLASSES.get(self.env)
+        if config_cls is None:
+            raise RuntimeError("Environment not recognized.")
+        return config_cls(**values)
+
+
+_base_config = GlobalConfig()
+config = FactoryConfig(_base_config.ENV)(
+    # Model instances are not revalidated, so the already parsed
+    # application config is reused as is.
+    APP_CONFIG=_base_config.APP_CONFIG,
+    **_base_config.model_dump(exclude_unset=True, exclude={"APP_CONFIG"}),
 )
+del _base_config
 """Configuration object to be used anywhere in the project's code.
 
 It contains both the application and the environment configurations:
@@ -8,14 +8,25 @@
 
 This module holds any enumeration used either in the configuration
 classes or throughout the code. Classes defined in this module should
-inherit from Python's :class:`~enum.Enum` builtin enumeration.
+inherit from Python's :class:`~enum.StrEnum` builtin enumeration.
 
 """
 
 from enum import Enum
 
+try:
+    from enum import StrEnum
+except ImportError:  # pragma: nocover
 
-class Environment(str, Enum):
+    class StrEnum(str, Enum):  # type: ignore[no-redef]
+        """Backport of :class:`enum.StrEnum` for Python < 3.11."""
+
+        def __str__(self) -> str:
+            """Use the member value as string representation."""
+            return str(self.value)
+
+
+class Environment(StrEnum):
     """Environment options.
 
     We define here the available environments and their names.
@@ -49,7 +60,7 @@ class Environment(str, Enum):
     """Special unit testing environment."""
 
 
-class LogLevel(str, Enum):
+class LogLevel(StrEnum):
     """Log level options.
 
     Use this enumerator to set the level of a given logging message:
@@ -91,21 +102,21 @@ class LogLevel(str, Enum):
     """
 
 
-class RouteMode(str, Enum):
+class RouteMode(StrEnum):
     """Enum class for the mode of the optimizer."""
 
     INBOUND = "inbound"
     OUTBOUND = "outbound"
 
 
-class CartographyProvider(str, Enum):
+class CartographyProvider(StrEnum):
     """Enum class for the cartography providers."""
 
     GOOGLE = "google"
     VALHALLA = "valhalla"
 
 
-class DistanceMetric(str, Enum):
+class DistanceMetric(StrEnum):
     """Enum class for the distance metrics."""
 
     METERS = "meters"
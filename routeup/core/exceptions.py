@@ -32,6 +32,15 @@ class TableCreationTimeout(KeyError):
         self.msg = msg
 
 
+class UrlExtraError(ValueError):
+    """Error raised when a URL has extra characters after its valid part."""
+
+    def __init__(self, extra):
+        """Set error instance parameters."""
+        super().__init__(f"URL has extra characters: {extra!r}")
+        self.extra = extra
+
+
 class MissingAPIKey(ValueError):
     """Error raised when no API key is provided."""
 
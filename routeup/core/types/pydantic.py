@@ -12,6 +12,7 @@ This module contains custom types based on
 """
 
 import re
+from functools import lru_cache
 from typing import TYPE_CHECKING, Generator, Pattern
 
 from pydantic import AfterValidator
@@ -24,37 +25,40 @@ if TYPE_CHECKING:  # pragma: nocover
     CallableGenerator = Generator[AnyCallable, None, None]
 
 from pydantic.networks import UrlConstraints  # type: ignore
-from pydantic.v1.errors import (
-    UrlExtraError,
-)
 
-SQLITE_DSN_SCHEMES = ["sqlite"]
+from ..exceptions import UrlExtraError
 
-_sqlite_uri_regex_cache = None
+SQLITE_DSN_SCHEMES = ["sqlite"]
 
+SQLITE_URI_REGEX: Pattern[str] = re.compile(
+    r"(?:(?P<scheme>[a-z][a-z0-9+\-.]+)://)?"  # scheme
+    r"(?P<host>/)?"  # host needs to be '/'
+    r"(?P<path>[^\s?#]*)?"  # path
+    r"(?:\?(?P<query>[^\s#]+))?",  # query
+    re.IGNORECASE,
+)
+"""Regular expression for SQLite URIs."""
 
-def sqlite_uri_regex() -> Pattern[str]:
-    """Regular expression for SQLite URIs."""
-    global _sqlite_uri_regex_cache
-    if _sqlite_uri_regex_cache is None:
-        _sqlite_uri_regex_cache = re.compile(
-            r"(?:(?P<scheme>[a-z][a-z0-9+\-.]+)://)?"  # scheme
-            r"(?P<host>/)?"  # host needs to be '/'
-            r"(?P<path>[^\s?#]*)?"  # path
-            r"(?:\?(?P<query>[^\s#]+))?",  # query
-            re.IGNORECASE,
-        )
-    return _sqlite_uri_regex_cache
 
+@lru_cache(maxsize=128)
+def _validate_uri(uri: str) -> str:
+    """Validates the string form of a SQLite URI.
 
-def validate(value):
-    """Validates the SQLite URI."""
-    m = sqlite_uri_regex().match(str(value))
+    Results are memoized since the same URIs are validated every
+    time a configuration object is built.
+    """
+    m = SQLITE_URI_REGEX.match(uri)
     assert m, "URL regex failed unexpectedly"
 
-    if m.end() != len(str(value)):
-        raise UrlExtraError(extra=value[m.end() :])
+    if m.end() != len(uri):
+        raise UrlExtraError(extra=uri[m.end() :])
+
+    return uri
+
 
+def validate(value):
+    """Validates the SQLite URI."""
+    _validate_uri(str(value))
     return value
 
 
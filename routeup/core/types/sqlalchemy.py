@@ -18,6 +18,9 @@ from sqlalchemy.dialects import mssql, postgresql
 from sqlalchemy.engine import Dialect
 from sqlalchemy.types import CHAR, TypeDecorator
 
+_NATIVE_UUID_DIALECTS = frozenset((mssql.dialect.name, postgresql.dialect.name))
+"""Dialects with a backend-native UUID type."""
+
 
 class UUIDSQLType(TypeDecorator):
     """Platform-independent UUID type.
@@ -92,13 +95,7 @@ class UUIDSQLType(TypeDecorator):
 
     def process_literal_param(self, value, dialect: Dialect):
         """Render a literal parameter inline within a statement."""
-        match value:
-            case None:
-                return value
-            case mssql.dialect.name | postgresql.dialect.name:
-                return f"{value}"
-            case _:
-                return f"{value}"
+        return None if value is None else str(value)
 
     def process_bind_param(self, value, dialect: Dialect):
         """Convert a bound parameter to its representation.
@@ -116,18 +113,23 @@ class UUIDSQLType(TypeDecorator):
             return value
         if not isinstance(value, UUID):
             value = self._coerce(value)
-        if dialect.name in (mssql.dialect.name, postgresql.dialect.name):
+        if dialect.name in _NATIVE_UUID_DIALECTS:
             return str(value)
         return value.hex
 
     def process_result_value(
         self, value: str | UUID | None, dialect: Dialect
     ) -> UUID | None:
-        """Cast a result row value to :class:`~uuid.UUID`."""
-        if value is None:
-            return value
-        if isinstance(value, UUID):
+        """Cast a result row value to :class:`~uuid.UUID`.
+
+        Values stored as ``CHAR(32)`` hex strings are decoded directly
+        into the UUID bytes, skipping the string normalization done by
+        the :class:`~uuid.UUID` constructor.
+        """
+        if value is None or isinstance(value, UUID):
             return value
+        if len(value) == 32:
+            return UUID(bytes=bytes.fromhex(value))
         return UUID(value)
 
 
@@ -210,11 +212,11 @@ class PathSQLType(TypeDecorator):
         of the dialect.
 
         """
+        if isinstance(value, Path):
+            return value.__fspath__()
         if value is None:
             return value
-        if not isinstance(value, Path):
-            value = self._coerce(value)
-        return str(value)
+        return self._coerce(value).__fspath__()
 
     def process_result_value(
         self, value: str | Path | None, dialect: Dialect
@@ -224,7 +226,8 @@ class PathSQLType(TypeDecorator):
             return value
         if isinstance(value, Path):
             return value
-        return Path(value.strip())
+        # Fixed-width CHAR columns are only padded on the right.
+        return Path(value.rstrip())
 
 
 __all__ = ["UUIDSQLType", "PathSQLType"]
@@ -67,7 +67,8 @@ a row and the full data table respectively:
     ...     name: Series[str]
 
 Now we can create the new CRUD class inheriting from our
-:class:`~.crud.base.CRUDBase` base class:
+:class:`~.crud.base.CRUDBase` base class. CRUD instances keep their
+state in ``__slots__``, so subclasses should declare theirs too:
 
 .. doctest::
 
@@ -83,7 +84,7 @@ Now we can create the new CRUD class inheriting from our
     ...         MyTableDFSchema
     ...     ]
     ... ):
-    ...     pass
+    ...     __slots__ = ()
     ...
     >>> my_table = CRUDMyTable(MyTable, MyTableDFSchema)
 
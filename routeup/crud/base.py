@@ -14,12 +14,24 @@ it may be included in the :class:`~.CRUDBase` class.
 
 """
 
-from typing import Any, Generic, Sequence, Type, TypeVar
+from functools import wraps
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Generic,
+    Iterator,
+    Sequence,
+    Type,
+    TypeVar,
+    get_args,
+    get_origin,
+)
 
 import pandas as pd
-from pandera.decorators import check_output
 from pandera.typing import DataFrame
-from sqlalchemy import insert, select, update
+from pydantic import SerializeAsAny, TypeAdapter
+from sqlalchemy import Select, insert, select, update
 from sqlalchemy.orm import DeclarativeBase, Session
 
 from routeup.core import logger
@@ -30,6 +42,51 @@ BaseModelType = TypeVar("BaseModelType", bound=DeclarativeBase)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseSchema)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseSchema)
 DFSchemaType = TypeVar("DFSchemaType", bound=BaseDFSchema)
+MethodType = TypeVar("MethodType", bound=Callable[..., pd.DataFrame])
+
+
+def check_output_df(method: MethodType) -> MethodType:
+    """Validate the DataFrame returned by a CRUD method.
+
+    The output is validated in place against the Pandera schema of the
+    CRUD instance (its ``schema_df`` attribute), like Pandera's
+    :func:`~pandera.decorators.check_output` does with a fixed schema.
+    Validation is lazy, so every failing check is reported at once.
+    Decorating at class level avoids wrapping the method again on every
+    CRUD instance.
+
+    Args:
+        method: CRUD method returning a DataFrame.
+
+    Returns: The decorated method.
+
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        output = method(self, *args, **kwargs)
+        return self.schema_df.to_schema().validate(output, lazy=True, inplace=True)
+
+    return wrapper  # type: ignore[return-value]
+
+
+_ANY_SCHEMA_LIST_ADAPTER = TypeAdapter(list[SerializeAsAny[BaseSchema]])
+"""Adapter dumping lists of any schemas, each one with its own fields."""
+
+
+def _schema_list_adapter(schema: Any) -> TypeAdapter:
+    """Get an adapter dumping lists of a schema in one call.
+
+    Args:
+        schema: A schema class, or a type variable if it is not known.
+
+    Returns: An adapter for lists of the schema, or for lists of any
+      schemas if ``schema`` is not a schema class.
+
+    """
+    if isinstance(schema, type) and issubclass(schema, BaseSchema):
+        return TypeAdapter(list[schema])  # type: ignore[valid-type]
+    return _ANY_SCHEMA_LIST_ADAPTER
 
 
 class CRUDBase(
@@ -45,6 +102,20 @@ class CRUDBase(
 
     """
 
+    __slots__ = ("model", "schema_df", "_columns")
+
+    _create_adapter: ClassVar[TypeAdapter] = _ANY_SCHEMA_LIST_ADAPTER
+    _update_adapter: ClassVar[TypeAdapter] = _ANY_SCHEMA_LIST_ADAPTER
+
+    def __init_subclass__(cls, **kwargs):
+        """Build the list adapters of the subclass create and update schemas."""
+        super().__init_subclass__(**kwargs)
+        for base in getattr(cls, "__orig_bases__", ()):
+            if get_origin(base) is CRUDBase:
+                _, create_schema, update_schema, _ = get_args(base)
+                cls._create_adapter = _schema_list_adapter(create_schema)
+                cls._update_adapter = _schema_list_adapter(update_schema)
+
     def __init__(self, model: Type[BaseModelType], schema_df: Type[DFSchemaType]):
         """**Instance parameters**.
 
@@ -62,7 +133,7 @@ class CRUDBase(
         """
         self.model = model
         self.schema_df = schema_df
-        self.get_df = check_output(schema_df.to_schema(), inplace=True)(self.get_df)  # type: ignore[method-assign]
+        self._columns = frozenset(model.__mapper__.columns.keys())
 
     def get_multi(
         self,
@@ -70,21 +141,47 @@ class CRUDBase(
         *,
         skip: int = None,
         limit: int = None,
-    ) -> Sequence[BaseModelType]:
+        yield_per: int | None = None,
+    ) -> Sequence[BaseModelType] | Iterator[BaseModelType]:
         """Get multiple elements.
 
+        By default, every element is loaded into a list. When
+        ``yield_per`` is given, elements are instead streamed from the
+        database in batches of that size, which keeps memory bounded
+        when iterating over large tables. The query is then run lazily,
+        when the returned iterator is first consumed.
+
         Args:
             db: Database object.
             skip: Number of elements to skip.
             limit: Maximum number of elements to return.
+            yield_per: Number of rows to fetch per batch when streaming.
 
-        Returns: List of database elements.
+        Returns: List of database elements, or an iterator over them if
+          ``yield_per`` is given.
 
         """
-        r = db.execute(select(self.model).offset(skip).limit(limit)).scalars().all()
+        stmt = select(self.model).offset(skip).limit(limit)
+        if yield_per is not None:
+            return self._stream(db, stmt.execution_options(yield_per=yield_per))
+        r = db.execute(stmt).scalars().all()
         logger.info(f"Got {len(r)} records from '{self.model.__tablename__}'")
         return r
 
+    def _stream(self, db: Session, stmt: Select) -> Iterator[BaseModelType]:
+        """Yield the elements selected by a statement one by one.
+
+        Args:
+            db: Database object.
+            stmt: Select statement, with the ``yield_per`` option.
+
+        """
+        n = 0
+        for n, obj in enumerate(db.execute(stmt).scalars(), start=1):
+            yield obj
+        logger.info(f"Got {n} records from '{self.model.__tablename__}'")
+
+    @check_output_df
     def get_df(self, db: Session) -> DataFrame[DFSchemaType]:
         """Get the database table as a Pandas DataFrame.
 
@@ -94,7 +191,7 @@ class CRUDBase(
         Returns: The database table as a Pandas DataFrame.
 
         """
-        return DataFrame(pd.read_sql(select(self.model), db.connection()))
+        return DataFrame(pd.read_sql_query(select(self.model), db.connection()))
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> BaseModelType:
         """Create an element in the database.
@@ -124,7 +221,7 @@ class CRUDBase(
             data: Data entries to be created.
 
         """
-        mappings = [x.model_dump() for x in data]
+        mappings = self._create_adapter.dump_python(data)
         logger.info(
             f"Creating {len(mappings)} new records in table "
             f"'{self.model.__tablename__}'"
@@ -149,14 +246,12 @@ class CRUDBase(
         Returns: The updated element as a SQLAlchemy ORM.
 
         """
-        obj_data = {k: v for k, v in vars(db_obj).items() if not k.startswith("_")}
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field in update_data.keys() & self._columns:
+            setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
@@ -173,7 +268,7 @@ class CRUDBase(
             data: Data entries to be updated.
 
         """
-        mappings = [x.model_dump() for x in data]
+        mappings = self._update_adapter.dump_python(data)
         logger.info(
             f"Updating {len(mappings)} records of table '{self.model.__tablename__}'"
         )
@@ -181,4 +276,4 @@ class CRUDBase(
         db.commit()
 
 
-__all__ = ["CRUDBase"]
+__all__ = ["CRUDBase", "check_output_df"]
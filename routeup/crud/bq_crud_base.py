@@ -8,22 +8,83 @@
 
 This class is used to load, update and delete data in BigQuery.
 """
-import json
-import time
+import io
+from concurrent.futures import Executor, Future, TimeoutError
+from datetime import date, datetime
+from functools import cached_property
 from typing import Generic, Type, TypeVar
+from uuid import uuid4
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
-from pandera.decorators import check_output
 from pandera.typing import DataFrame
 
 from routeup.core import logger
 from routeup.core.exceptions import NotExistingJSONSchema, TableCreationTimeout
+from routeup.crud.base import check_output_df
 from routeup.db.bigquery_handler import BigQueryDataHandler
 from routeup.schemas_df.base import BaseDFSchema
 
 DFSchemaType = TypeVar("DFSchemaType", bound=BaseDFSchema)
 
+_BQ_TO_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "GEOGRAPHY": pa.string(),
+    "JSON": pa.string(),
+    "BYTES": pa.binary(),
+    "INTEGER": pa.int64(),
+    "INT64": pa.int64(),
+    "FLOAT": pa.float64(),
+    "FLOAT64": pa.float64(),
+    "NUMERIC": pa.decimal128(38, 9),
+    "BIGNUMERIC": pa.decimal256(76, 38),
+    "BOOLEAN": pa.bool_(),
+    "BOOL": pa.bool_(),
+    "DATE": pa.date32(),
+    "TIME": pa.time64("us"),
+    "DATETIME": pa.timestamp("us"),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+}
+"""Arrow type of each BigQuery scalar column type."""
+
+_QUERY_PARAMETER_TYPES = (
+    (bool, "BOOL"),
+    (int, "INT64"),
+    (float, "FLOAT64"),
+    (str, "STRING"),
+    (datetime, "TIMESTAMP"),
+    (date, "DATE"),
+)
+"""BigQuery type of the query parameters, by Python type.
+
+Order matters: ``bool`` is a subclass of ``int``, and ``datetime`` of
+``date``.
+"""
+
+
+def _query_parameters(**params) -> list[bigquery.ScalarQueryParameter]:
+    """Build BigQuery query parameters from keyword arguments.
+
+    Args:
+        **params: Value of each ``@name`` parameter in the query.
+
+    Returns: The query parameters, typed after their Python values.
+
+    Raises:
+        TypeError: If a value has no BigQuery parameter type.
+    """
+    parameters = []
+    for name, value in params.items():
+        for python_type, bq_type in _QUERY_PARAMETER_TYPES:
+            if isinstance(value, python_type):
+                break
+        else:
+            raise TypeError(f"Unsupported query parameter type for '{name}'.")
+        parameters.append(bigquery.ScalarQueryParameter(name, bq_type, value))
+    return parameters
+
 
 class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
     """Handler for data manipulation."""
@@ -55,11 +116,103 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
         self.schema_path = schema_path
         self.schema_df = schema_df
         self.primary_key = primary_key
-        self.read = check_output(schema_df.to_schema(), inplace=True)(self.read)  # type: ignore[method-assign]
-        self.write = check_output(schema_df.to_schema(), inplace=True)(self.write)  # type: ignore[method-assign]
-        self.upsert = check_output(schema_df.to_schema(), inplace=True)(self.upsert)  # type: ignore[method-assign]
         self.timeout = timeout
+        self._table_fqn = f"{project_id}.{dataset_id}.{table_id}"
+        self._select_all = f"SELECT * FROM `{self._table_fqn}`"
+        self._delete_all = f"DELETE FROM `{self._table_fqn}`"
+
+    @cached_property
+    def schema(self) -> list[bigquery.SchemaField]:
+        """BigQuery schema of the table, read once from the schema file."""
+        return self.client.schema_from_json(self.schema_path)
+
+    @cached_property
+    def _arrow_schema(self) -> pa.Schema | None:
+        """Arrow schema matching the BigQuery schema of the table.
+
+        It is ``None`` if some column type has no scalar Arrow
+        equivalent (e.g. ``RECORD``), and then Arrow infers the types
+        from the DataFrame.
+        """
+        fields = []
+        for field in self.schema:
+            arrow_type = _BQ_TO_ARROW_TYPES.get(field.field_type)
+            if arrow_type is None:
+                return None
+            if field.mode == "REPEATED":
+                arrow_type = pa.list_(arrow_type)
+            fields.append(
+                pa.field(field.name, arrow_type, nullable=field.mode != "REQUIRED")
+            )
+        return pa.schema(fields)
+
+    def _df_to_parquet(self, df: DataFrame[DFSchemaType]) -> io.BytesIO:
+        """Serialize a DataFrame as Parquet, ready to be loaded in BigQuery.
+
+        Datetimes are floored to microseconds, the precision of BigQuery,
+        since the cast to the Arrow schema rejects any truncation.
+
+        Args:
+            df: DataFrame to serialize.
+
+        Returns: In-memory Parquet file, rewound to its start.
+        """
+        datetimes = df.select_dtypes(include=["datetime", "datetimetz"]).columns
+        if len(datetimes):
+            df = df.assign(
+                **{column: df[column].dt.floor("us") for column in datetimes}
+            )
+        table = pa.Table.from_pandas(
+            df, schema=self._arrow_schema, preserve_index=False
+        )
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression="snappy")
+        buffer.seek(0)
+        return buffer
+
+    def _load(
+        self, df: DataFrame[DFSchemaType], table_id: str, write_disposition: str
+    ) -> bigquery.LoadJob:
+        """Start a job loading a DataFrame into a table, as Parquet.
+
+        Args:
+            df: DataFrame to load.
+            table_id: Fully qualified id of the destination table.
+            write_disposition: BigQuery write disposition of the job.
 
+        Returns: The (asynchronous) load job.
+        """
+        job_config = bigquery.LoadJobConfig(
+            schema=self.schema,
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=write_disposition,
+        )
+        return self.client.load_table_from_file(
+            self._df_to_parquet(df), table_id, job_config=job_config
+        )
+
+    @cached_property
+    def _merge_template(self) -> str:
+        """MERGE statement used by :meth:`upsert`.
+
+        The statement is built once from the table schema, and has a
+        ``target`` and a ``source`` placeholder for the table ids.
+        """
+        pk = self.primary_key
+        merge_set = ", ".join(
+            f"target.{field.name} = source.{field.name}"
+            for field in self.schema
+            if field.name != pk
+        )
+        return (
+            "MERGE `{target}` AS target "
+            "USING `{source}` AS source "
+            f"ON target.{pk} = source.{pk} "
+            f"WHEN MATCHED THEN UPDATE SET {merge_set} "
+            "WHEN NOT MATCHED THEN INSERT ROW"
+        )
+
+    @check_output_df
     def read(self, condition: str | None = None) -> DataFrame[DFSchemaType]:
         """Read data from table.
 
@@ -70,9 +223,9 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
             Dataframe with the data read from the table.
         """
         # Construct the query to fetch data from the specified table
-        query = f"SELECT * FROM `{self.project_id}.{self.dataset_id}.{self.table_id}`"
+        query = self._select_all
         if condition:
-            query += f" WHERE {condition}"
+            query = f"{query} WHERE {condition}"
         # Run the query
         df = self.client.query(query).to_dataframe()
         return df  # type: ignore[return-value]
@@ -87,17 +240,24 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
             f"SELECT COUNT(*) FROM `{self.project_id}.{self.dataset_id}.{table_name}`"
         )
         result = self.client.query(query).result()
-        return [row[0] for row in result][0]
+        return next(iter(result))[0]
 
     def is_table_empty(self, *, table_name: str) -> bool:
         """Check if table is empty.
 
+        The row count is read from the table metadata, so no query is run.
+        Tables are filled with load jobs, whose rows are always counted in
+        the metadata (unlike rows still in the streaming buffer).
+
         Args:
             table_name (str): Table name.
         """
-        nrows = self.get_number_of_rows(table_name=table_name)
-        return nrows == 0
+        table = self.client.get_table(
+            f"{self.project_id}.{self.dataset_id}.{table_name}"
+        )
+        return table.num_rows == 0
 
+    @check_output_df
     def upsert(self, *, df: DataFrame[DFSchemaType]) -> DataFrame[DFSchemaType]:
         """Update or append data in table.
 
@@ -107,46 +267,31 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
         Raises:
             ValueError: If the DataFrame does not have a 'service_id' column.
         """
-        table_id = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+        table_id = self._table_fqn
         # check if table exists
         if not self.is_table_in_db(table_name=self.table_id):
             logger.info(f"Table {table_id} not found, creating it.")
             self.write(df=df, asynchronous=False)
             return df
 
-        # create view for merging
-        temp_view = f"temp_view_for_update_{self.table_id}"
+        # create view for merging, with a unique name so that concurrent
+        # upserts on the same table do not share it
+        temp_view = f"temp_view_for_update_{self.table_id}_{uuid4().hex}"
         temp_view_id = f"{self.project_id}.{self.dataset_id}.{temp_view}"
-        with open(self.schema_path) as schema_file:
-            schema = json.load(schema_file)
-        job_config = bigquery.LoadJobConfig(
-            schema=schema,
-            write_disposition="WRITE_APPEND",
-        )
         # this next operation is asynchronous
-        self.client.load_table_from_dataframe(df, temp_view_id, job_config=job_config)
+        load_job = self._load(df, temp_view_id, "WRITE_APPEND")
 
         # Use the MERGE statement to update or append records
-        merge_query = f"""
-            MERGE `{table_id}` AS target
-            USING `{temp_view_id}` AS source
-            ON target.{self.primary_key} = source.{self.primary_key}
-            WHEN MATCHED THEN
-                UPDATE SET {", ".join([f'target.{col} = source.{col}' for col in df.columns if col != self.primary_key])}
-            WHEN NOT MATCHED THEN
-                INSERT ROW
-        """
+        merge_query = self._merge_template.format(
+            target=table_id, source=temp_view_id
+        )
         try:
-            # Wait unitl the table has been created if the table has been created
-            i = 0
-            while not self.is_table_in_db(table_name=temp_view) and i < self.timeout:
-                time.sleep(1)
-                i += 1
-            if i == self.timeout:
-                logger.error(f"Table {temp_view_id} not created, timeout reached.")
-                return df
-            else:
-                self.client.query(merge_query).result()
+            # Wait until the temporary table has been loaded
+            load_job.result(timeout=self.timeout)
+            self.client.query(merge_query).result()
+        except TimeoutError:
+            logger.error(f"Table {temp_view_id} not created, timeout reached.")
+            return df
         except NotFound:
             logger.error(f"Can not find table {table_id}.")
             self.write(df=df)
@@ -157,6 +302,24 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
         logger.debug("Update process completed.")
         return df
 
+    def upsert_async(
+        self, *, df: DataFrame[DFSchemaType], executor: Executor
+    ) -> "Future[DataFrame[DFSchemaType]]":
+        """Update or append data in table, in the background.
+
+        The BigQuery client is thread-safe, so several upserts submitted
+        to the same executor run their load and merge jobs concurrently.
+
+        Args:
+            df: DataFrame to update or append.
+            executor: Executor running the upsert, e.g. a
+              :class:`~concurrent.futures.ThreadPoolExecutor`.
+
+        Returns: A future with the result of :meth:`upsert`.
+        """
+        return executor.submit(self.upsert, df=df)
+
+    @check_output_df
     def write(
         self,
         *,
@@ -169,45 +332,41 @@ class BigQueryCRUDBase(BigQueryDataHandler, Generic[DFSchemaType]):
         Args:
             df: DataFrame to write.
             disposition: Write disposition. It an be APPEND, TRUNCATE or EMPTY.
-            asynchronous: If True, the method will wait until the table is created.
+            asynchronous: If False, the method will wait until the data is loaded.
         """
         # Load the schema of the table
-        table_id = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
+        table_id = self._table_fqn
         if self.schema_path:
-            schema = self.client.schema_from_json(self.schema_path)
-            job_config = bigquery.LoadJobConfig(
-                schema=schema,
-                write_disposition=f"WRITE_{disposition}",
-            )
-            self.client.load_table_from_dataframe(df, table_id, job_config=job_config)
-            # wait until the table has been created
-            i = 0
-            while (
-                not self.is_table_in_db(table_name=self.table_id)
-                and i < self.timeout
-                and not asynchronous
-            ):
-                time.sleep(1)
-                i += 1
-            if i < self.timeout:
-                logger.debug(f"Loaded {len(df)} rows into {table_id}.")
-            else:
-                logger.error(f"Cannot create elements in table {table_id}.")
-                raise TableCreationTimeout("Reached table creation timeout.")
+            load_job = self._load(df, table_id, f"WRITE_{disposition}")
+            if not asynchronous:
+                # wait until the data has been loaded
+                try:
+                    load_job.result(timeout=self.timeout)
+                except TimeoutError as e:
+                    logger.error(f"Cannot create elements in table {table_id}.")
+                    raise TableCreationTimeout("Reached table creation timeout.") from e
+            # the load may have created the table
+            self.invalidate_cache()
+            logger.debug(f"Loaded {len(df)} rows into {table_id}.")
         else:
             logger.error(f"Cannot create elements in table {table_id}.")
             raise NotExistingJSONSchema("Schema path not provided.")
         return df
 
-    def delete(self, condition: str | None = None):
-        """Delete data from table.
+    def delete(self, condition: str | None = None, **params):
+        """Delete data from table, waiting until the deletion is done.
 
         Args:
-            condition: Condition to filter the data to be deleted.
+            condition: Condition to filter the data to be deleted. It can
+              refer to query parameters as ``@name``.
+            **params: Values of the query parameters in the condition.
 
         """
-        query = f"DELETE FROM `{self.project_id}.{self.dataset_id}.{self.table_id}`"
+        query = self._delete_all
         if condition:
-            query += f" WHERE {condition}"
-        self.client.query(query)
+            query = f"{query} WHERE {condition}"
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=_query_parameters(**params)
+        )
+        self.client.query(query, job_config=job_config).result()
         logger.debug(f"Deleted data from {self.table_id}.")
@@ -5,9 +5,13 @@
 # See the LICENSE file for more information.
 #
 """Region CRUD."""
+from functools import cached_property
+
+from google.cloud import bigquery
+
 from routeup.core import config, logger
 from routeup.core.exceptions import NoRegionFoundError
-from routeup.crud.bq_crud_base import BigQueryCRUDBase
+from routeup.crud.bq_crud_base import BigQueryCRUDBase, _query_parameters
 from routeup.schemas_df.region import RegionDFSchema
 
 
@@ -15,6 +19,22 @@ from routeup.schemas_df.region import RegionDFSchema
 class RegionCRUD(BigQueryCRUDBase[RegionDFSchema]):
     """CRUD for train features_service_is_play_pressed."""
 
+    _REGION_SQL = (
+        "SELECT r.name FROM `{table}` r "
+        "WHERE ST_CONTAINS(ST_GEOGFROMTEXT(r.geometry), ST_GEOGPOINT(@lng, @lat)) "
+        "LIMIT 2"
+    )
+    """Query of the regions containing a point, given as parameters.
+
+    Two rows at most are fetched: the first one is returned, and a second
+    one is only used to warn about overlapping regions.
+    """
+
+    @cached_property
+    def _region_sql(self) -> str:
+        """Query of the regions containing a point, for this table."""
+        return self._REGION_SQL.format(table=self._table_fqn)
+
     def get_region_containing_point(self, lat: float, lng: float) -> str:
         """Get name of region containing the given latitude and longitude point.
 
@@ -22,18 +42,19 @@ class RegionCRUD(BigQueryCRUDBase[RegionDFSchema]):
             lat: Latitude of the point.
             lng: Longitude of the point.
         """
-        # Construct the query to fetch regions containing the given point
-        query = f""" SELECT r.name
-                     FROM `{self.project_id}.{self.dataset_id}.{self.table_id}` r
-                     WHERE ST_CONTAINS(ST_GEOGFROMTEXT(r.geometry), ST_GEOGPOINT({lng},{lat}))"""
+        # Pass the point as query parameters, so the query text is constant
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=_query_parameters(lng=lng, lat=lat)
+        )
 
-        # Run the query
-        df = self.client.query(query).to_dataframe()
+        # Run the query, reading the rows directly instead of a DataFrame
+        rows = self.client.query(self._region_sql, job_config=job_config).result()
 
-        if not df.empty:
-            region_name = df.iloc[0]["name"]
+        first = next(iter(rows), None)
+        if first is not None:
+            region_name = first["name"]
             logger.info(f"Region found for point ({lat},{lng}): {region_name}")
-            if len(df) > 1:
+            if rows.total_rows > 1:
                 logger.warning(
                     f"Multiple regions found for point ({lat},{lng}). Returning the first one."
                 )
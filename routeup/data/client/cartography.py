@@ -4,16 +4,52 @@
 # and is released under the MIT License Agreement.
 # See the LICENSE file for more information.
 #
-"""Cartography API."""
+"""Cartography API.
+
+The provider clients are imported when a :class:`CartographyAPI` using
+them is created, so that only the dependencies of the providers actually
+used are loaded. Clients are shared by every :class:`CartographyAPI`
+with the same provider and base URL.
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
 from pydantic_extra_types.coordinate import Coordinate
 
 from routeup import schemas
 from routeup.core.config.enums import CartographyProvider
-from routeup.data.client.gmaps import GoogleMaps  #
-
-# from routeup.data.client import GoogleMaps, ValhallaClient
 from routeup.data.client.utils import MatrixResult
-from routeup.data.client.valhalla import ValhallaClient
+
+if TYPE_CHECKING:
+    from routeup.data.client.gmaps import GoogleMaps
+    from routeup.data.client.valhalla import ValhallaClient
+
+
+@lru_cache(maxsize=8)
+def _make_client(
+    provider: CartographyProvider, base_url: str | None
+) -> "GoogleMaps | ValhallaClient":
+    """Build the client of a cartography provider.
+
+    Args:
+        provider: Cartography provider.
+        base_url: Base URL of the provider API, if any.
+
+    Returns: The provider client, cached by provider and base URL.
+    """
+    if provider == CartographyProvider.VALHALLA:
+        if base_url:
+            from routeup.data.client.valhalla import ValhallaClient
+
+            return ValhallaClient(base_url=base_url)
+        else:
+            raise ValueError("base_url is required for Valhalla")
+    elif provider == CartographyProvider.GOOGLE:
+        from routeup.data.client.gmaps import GoogleMaps
+
+        return GoogleMaps()
+    else:
+        raise ValueError("provider not available")
 
 
 class CartographyAPI:
@@ -21,16 +57,7 @@ class CartographyAPI:
 
     def __init__(self, provider: CartographyProvider, base_url: str = None):
         """Cartography API initialization."""
-        self.client: GoogleMaps | ValhallaClient | None = None
-        if provider == CartographyProvider.VALHALLA:
-            if base_url:
-                self.client = ValhallaClient(base_url=base_url)
-            else:
-                raise ValueError("base_url is required for Valhalla")
-        elif provider == CartographyProvider.GOOGLE:
-            self.client = GoogleMaps()
-        else:
-            raise ValueError("provider not available")
+        self.client: GoogleMaps | ValhallaClient = _make_client(provider, base_url)
 
     def get_matrix(self, stops: list[Coordinate], costing: str = None) -> MatrixResult:
         """Get matrix."""
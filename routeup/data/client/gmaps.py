@@ -4,10 +4,16 @@
 # and is released under the MIT License Agreement.
 # See the LICENSE file for more information.
 #
-"""Google Maps client."""
+"""Google Maps client.
+
+Matrix and route requests that are split into several API calls issue
+them concurrently, from a thread pool. Matrix API results are cached,
+slice by slice.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import googlemaps
 import numpy as np
-from polyline import polyline
 from pydantic_extra_types.coordinate import Coordinate
 
 from routeup import schemas
@@ -17,25 +23,43 @@ from routeup.core.exceptions import (
     InvalidResponseFormat,
     MissingAPIKey,
 )
-from routeup.data.client.utils import MatrixResult, slice_matrix
-from routeup.schemas.cartography import RequestStopGoogle
+from routeup.data.client.utils import (
+    MatrixCache,
+    MatrixResult,
+    concatenate,
+    coordinates_array,
+    count_tiles,
+    decode_polyline,
+    slice_matrix,
+)
 
 
 class GoogleMaps(metaclass=Singleton):
     """Google Maps client."""
 
-    def __init__(self, max_route_stops: int = 27, max_matrix_elements: int = 100):
+    def __init__(
+        self,
+        max_route_stops: int = 27,
+        max_matrix_elements: int = 100,
+        max_workers: int = 16,
+        matrix_dtype: np.dtype = np.float32,
+    ):
         """Google Maps client.
 
         Args:
             max_route_stops: Maximum number of stops in a route.
             max_matrix_elements: Maximum number of elements in time/distance matrix.
+            max_workers: Maximum number of concurrent API calls.
+            matrix_dtype: Data type of the time/distance matrices.
         """
         if not config.GOOGLE_MAPS_API_KEY:
             raise MissingAPIKey("Google Maps API key not found")
         self.client = googlemaps.Client(key=config.GOOGLE_MAPS_API_KEY)
         self.max_route_stops = max_route_stops
         self.max_matrix_elements = max_matrix_elements
+        self.max_workers = max_workers
+        self.matrix_dtype = matrix_dtype
+        self._matrix_cache = MatrixCache()
         self._polyline_precision = 5
         if config.DISTANCE_METRIC == "meters":
             self.distance_conversion_factor = 1.0
@@ -43,6 +67,7 @@ class GoogleMaps(metaclass=Singleton):
             self.distance_conversion_factor = 1e-3
         else:
             raise ValueError("Invalid distance metric")
+        self._scale_distances = self.distance_conversion_factor != 1
 
     def _parse_matrix_response(self, response: dict) -> MatrixResult:
         """Parse the response from Google Maps Matrix API.
@@ -53,45 +78,26 @@ class GoogleMaps(metaclass=Singleton):
         Returns:
         - A tuple containing time matrix and distance matrix.
         """
-        if "rows" not in response:
-            raise InvalidResponseFormat("Invalid response format: 'rows' not found")
-
-        rows = response["rows"]
-        num_rows = len(rows)
-
-        if num_rows == 0:
-            raise InvalidResponseFormat("No rows in response")
-
-        time_matrix = []
-        distance_matrix = []
-
-        for row in rows:
-            if "elements" not in row:
-                raise InvalidResponseFormat("'elements' not found in a row")
-
-            elements = row["elements"]
-
-            row_time = []
-            row_distance = []
-
-            for element in elements:
-                if "duration" not in element or "distance" not in element:
-                    raise InvalidResponseFormat(
-                        "'duration' or 'distance' not found in an element"
-                    )
-
-                duration = element["duration"]["value"]
-                distance = (
-                    element["distance"]["value"] * self.distance_conversion_factor
-                )
-
-                row_time.append(duration)
-                row_distance.append(distance)
-
-            time_matrix.append(row_time)
-            distance_matrix.append(row_distance)
+        try:
+            rows = response["rows"]
+            if len(rows) == 0:
+                raise InvalidResponseFormat("No rows in response")
+            time_matrix = np.asarray(
+                [[e["duration"]["value"] for e in row["elements"]] for row in rows],
+                dtype=self.matrix_dtype,
+            )
+            distance_matrix = np.asarray(
+                [[e["distance"]["value"] for e in row["elements"]] for row in rows],
+                dtype=self.matrix_dtype,
+            )
+        except (KeyError, TypeError) as e:
+            raise InvalidResponseFormat(f"Invalid response format: {e}") from e
+        except ValueError as e:
+            raise InvalidResponseFormat("Rows have different lengths") from e
 
-        return MatrixResult(np.array(time_matrix), np.array(distance_matrix))
+        if self._scale_distances:
+            distance_matrix *= self.distance_conversion_factor
+        return MatrixResult(time_matrix, distance_matrix)
 
     def _parse_route_response(self, response: list[dict]) -> schemas.CartographyRoute:
         """Parse the response from the Distance API (e.g., Valhalla).
@@ -108,15 +114,15 @@ class GoogleMaps(metaclass=Singleton):
                 "'overview_polyline' or 'legs' not found in response"
             )
         encoded_polyline = route["overview_polyline"]["points"]
-        coordinates = polyline.decode(
-            encoded_polyline, precision=self._polyline_precision
-        )
+        coordinates = decode_polyline(encoded_polyline, self._polyline_precision)
         try:
             times = [leg["duration"]["value"] for leg in route["legs"]]
-            distances = [
-                leg["distance"]["value"] * self.distance_conversion_factor
-                for leg in route["legs"]
-            ]
+            distances = [leg["distance"]["value"] for leg in route["legs"]]
+            if self._scale_distances:
+                distances = [
+                    distance * self.distance_conversion_factor
+                    for distance in distances
+                ]
         except KeyError as e:
             raise InvalidResponseFormat(f"{e}") from e
 
@@ -125,11 +131,29 @@ class GoogleMaps(metaclass=Singleton):
         )
 
     @staticmethod
-    def _prepare_stops(stops: list[Coordinate]) -> list[dict]:
-        return [
-            RequestStopGoogle(lat=stop.latitude, lng=stop.longitude).model_dump()
-            for stop in stops
-        ]
+    def _prepare_stop(stop: Coordinate) -> dict:
+        """Prepare a single stop for API request.
+
+        Args:
+            stop (Coordinate): Stop.
+        """
+        return {"lat": stop.latitude, "lng": stop.longitude}
+
+    @staticmethod
+    def _prepare_stops(stops: list[Coordinate] | np.ndarray) -> list[dict]:
+        """Prepare stops for API request.
+
+        Stops are dumped straight to the
+        :class:`~routeup.schemas.cartography.RequestStopGoogle` format:
+        coordinates are already validated, so no model is built per stop.
+
+        Args:
+            stops (list[Coordinate] | np.ndarray): List of stops, or array
+              with their latitudes and longitudes.
+        """
+        if isinstance(stops, np.ndarray):
+            return [{"lat": lat, "lng": lng} for lat, lng in stops.tolist()]
+        return [{"lat": stop.latitude, "lng": stop.longitude} for stop in stops]
 
     def _prepare_request_route(self, stops: list[Coordinate], costing: str) -> dict:
         """Prepare request for Google Maps API.
@@ -138,27 +162,62 @@ class GoogleMaps(metaclass=Singleton):
             stops (list[Coordinate]): List of stops.
             costing (str): Costing model.
         """
-        stops_input = self._prepare_stops(stops)
-        if len(stops_input) < 2:
+        n_stops = len(stops)
+        if n_stops < 2:
             raise InvalidRequestFormat("At least two stops are required")
-        elif len(stops_input) < 3:
-            # TODO claudia 2024/04/03 - transform this to pydantic model
-            return {
-                "origin": stops_input[0],
-                "destination": stops_input[1],
-                "mode": costing,
-            }
-        elif (len(stops_input) >= 3) and (len(stops_input) <= self.max_route_stops):
-            return {
-                "origin": stops_input[0],
-                "destination": stops_input[-1],
-                "waypoints": stops_input[1:-1],
-                "mode": costing,
-            }
-        else:
+        if n_stops > self.max_route_stops:
             raise InvalidRequestFormat(
                 f"Maximum number of stops is {self.max_route_stops}"
             )
+        # TODO claudia 2024/04/03 - transform this to pydantic model
+        request = {
+            "origin": self._prepare_stop(stops[0]),
+            "destination": self._prepare_stop(stops[-1]),
+            "mode": costing,
+        }
+        if n_stops > 2:
+            request["waypoints"] = self._prepare_stops(stops[1:-1])
+        return request
+
+    def _get_matrix_slice(
+        self,
+        stops_input: list[dict],
+        points: np.ndarray,
+        slice: dict,
+        costing: str,
+    ) -> MatrixResult:
+        """Get a slice of the time/distance matrix from Google Maps API.
+
+        Args:
+            stops_input (list[dict]): List of stops, prepared for the API.
+            points (np.ndarray): Latitude and longitude of the stops.
+            slice (dict): Row and column ranges of the slice.
+            costing (str): Costing model.
+        """
+        logger.info(
+            f"Calling Matrix API from origin stops {slice['start_row']} "
+            f"to {slice['end_row']} and destination stops "
+            f"{slice['start_col']} to {slice['end_col']}"
+        )
+        key = MatrixCache.key(
+            points[slice["start_row"] : slice["end_row"]],
+            points[slice["start_col"] : slice["end_col"]],
+            costing,
+        )
+        m = self._matrix_cache.get(key)
+        if m is not None:
+            logger.debug("Matrix API result found in cache")
+            return m
+
+        origin = stops_input[slice["start_row"] : slice["end_row"]]
+        destination = stops_input[slice["start_col"] : slice["end_col"]]
+
+        response = self.client.distance_matrix(
+            origins=origin, destinations=destination, mode=costing
+        )
+        m = self._parse_matrix_response(response)
+        self._matrix_cache.put(key, m)
+        return m
 
     def get_matrix(self, stops: list[Coordinate], costing: str = None) -> MatrixResult:
         """Get time/distance matrix from Google Maps API from all stops to all stops.
@@ -171,35 +230,35 @@ class GoogleMaps(metaclass=Singleton):
             costing = "driving"
         n = len(stops)
         logger.info(f"Getting time and distance matrix for {n} stops")
-        time_matrix = np.zeros((n, n))
-        distance_matrix = np.zeros((n, n))
+        time_matrix = np.zeros((n, n), dtype=self.matrix_dtype)
+        distance_matrix = np.zeros((n, n), dtype=self.matrix_dtype)
+        # Prepare the stops once, every slice takes its rows and columns
+        points = coordinates_array(stops)
+        stops_input = self._prepare_stops(points)
         # Divide the matrix into chuncks of maximum max_matrix_elements elements
         slices = slice_matrix(0, n, 0, n, self.max_matrix_elements)
-        for slice in slices:
-            logger.info(
-                f"Calling Matrix API from origin stops {slice['start_row']} "
-                f"to {slice['end_row']} and destination stops "
-                f"{slice['start_col']} to {slice['end_col']}"
-            )
-            origin_stops = stops[slice["start_row"] : slice["end_row"]]
-            destination_stops = stops[slice["start_col"] : slice["end_col"]]
-
-            origin = self._prepare_stops(origin_stops)
-            destination = self._prepare_stops(destination_stops)
-
-            response = self.client.distance_matrix(
-                origins=origin, destinations=destination, mode=costing
-            )
-            m = self._parse_matrix_response(response)
-            time_matrix[
-                slice["start_row"] : slice["end_row"],
-                slice["start_col"] : slice["end_col"],
-            ] = m.time_matrix
-
-            distance_matrix[
-                slice["start_row"] : slice["end_row"],
-                slice["start_col"] : slice["end_col"],
-            ] = m.distance_matrix
+        n_slices = count_tiles(n, n, self.max_matrix_elements)
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, n_slices))
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._get_matrix_slice, stops_input, points, slice, costing
+                ): slice
+                for slice in slices
+            }
+            for future in as_completed(futures):
+                slice = futures[future]
+                m = future.result()
+                time_matrix[
+                    slice["start_row"] : slice["end_row"],
+                    slice["start_col"] : slice["end_col"],
+                ] = m.time_matrix
+
+                distance_matrix[
+                    slice["start_row"] : slice["end_row"],
+                    slice["start_col"] : slice["end_col"],
+                ] = m.distance_matrix
 
         return MatrixResult(time_matrix, distance_matrix)
 
@@ -211,15 +270,10 @@ class GoogleMaps(metaclass=Singleton):
         Args:
             routes (list[schemas.CartographyRoute]): List of routes.
         """
-        coordinates = []
-        times = []
-        distances = []
-        for route in routes:
-            coordinates.extend(route.coordinates)
-            times.extend(route.times)
-            distances.extend(route.distances)
         return schemas.CartographyRoute(
-            coordinates=coordinates, times=times, distances=distances
+            coordinates=concatenate([route.coordinates for route in routes]),
+            times=concatenate([route.times for route in routes]),
+            distances=concatenate([route.distances for route in routes]),
         )
 
     def get_route(
@@ -235,14 +289,37 @@ class GoogleMaps(metaclass=Singleton):
             costing = "driving"
         # Divide the route in chunks of self.max_route_stops stops
         start_idx, end_idx = 0, min(len(stops), self.max_route_stops)
-        routes = []
+        chunks = []
         while (end_idx <= len(stops)) and (start_idx < (len(stops) - 1)):
-            logger.info(f"Getting route from stop {start_idx} to {end_idx}")
-            # prepare request and call API
-            request = self._prepare_request_route(stops[start_idx:end_idx], costing)
-            response = self.client.directions(**request)
-            routes.append(self._parse_route_response(response))
+            chunks.append((start_idx, end_idx))
             # update indexes
             start_idx = end_idx - 1
             end_idx = min(end_idx + self.max_route_stops, len(stops))
+        # Call the API for every chunk at once, keeping the routes in order
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_workers, len(chunks)))
+        ) as executor:
+            routes = list(
+                executor.map(
+                    lambda chunk: self._get_route_chunk(stops, *chunk, costing),
+                    chunks,
+                )
+            )
         return self._combine_routes(routes)
+
+    def _get_route_chunk(
+        self, stops: list[Coordinate], start_idx: int, end_idx: int, costing: str
+    ) -> schemas.CartographyRoute:
+        """Get the route between a range of stops from Google Maps API.
+
+        Args:
+            stops (list[Coordinate]): List of stops.
+            start_idx (int): Index of the first stop of the route.
+            end_idx (int): Index after the last stop of the route.
+            costing (str): Costing model.
+        """
+        logger.info(f"Getting route from stop {start_idx} to {end_idx}")
+        # prepare request and call API
+        request = self._prepare_request_route(stops[start_idx:end_idx], costing)
+        response = self.client.directions(**request)
+        return self._parse_route_response(response)
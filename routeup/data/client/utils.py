@@ -17,56 +17,274 @@
 
     >>> matrix = MatrixResult(time_matrix=time_matrix, distance_matrix=distance_matrix)
     >>> slice = slice_matrix(0, 3, 0, 3, 8)
+
+Matrix API results can be memoized in a :class:`MatrixCache`:
+
+.. doctest::
+
+    >>> from routeup.data.client.utils import MatrixCache
+    >>> cache = MatrixCache(maxsize=8)
+    >>> key = MatrixCache.key([(41.38, 2.17)], [(41.39, 2.18)], "auto")
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, matrix)
+    >>> cache.get(key).time_matrix[0, 0]
+    1
+
+Encoded polylines are decoded with the Rust-backed ``pypolyline`` if it
+is installed, which is much faster on long routes, and with the pure
+Python ``polyline`` otherwise.
 """
+import hashlib
+import math
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Sequence, TypeVar
 
 import numpy as np
 
+try:
+    from pypolyline.cutil import decode_polyline as _decode_polyline
+except ImportError:  # pragma: no cover
+    _decode_polyline = None
+    import polyline
+
+if TYPE_CHECKING:
+    from pydantic_extra_types.coordinate import Coordinate
+
+T = TypeVar("T")
+
 
 @dataclass
 class MatrixResult:
-    """A dataclass to represent time and distance matrices."""
+    """A dataclass to represent time and distance matrices.
+
+    Clients return ``float32`` matrices by default: API durations and
+    distances fit in them, with half the memory of ``float64``.
+    """
 
     time_matrix: np.ndarray
     distance_matrix: np.ndarray
 
+    def to_int(self, scale: float = 1) -> "MatrixResult":
+        """Round the matrices to integers, e.g. for OR-Tools costs.
+
+        .. doctest::
+
+            >>> MatrixResult(np.array([[0.4, 1.6]]), np.array([[2.5, 3.5]])).to_int()
+            MatrixResult(time_matrix=array([[0, 2]]), distance_matrix=array([[2, 4]]))
+
+        Args:
+            scale: Factor applied to the matrices before rounding.
+
+        Returns: The scaled matrices, rounded to ``int64``.
+        """
+        return MatrixResult(
+            np.rint(self.time_matrix * scale).astype(np.int64),
+            np.rint(self.distance_matrix * scale).astype(np.int64),
+        )
+
+
+class MatrixCache:
+    """Thread-safe LRU cache of matrix API results.
+
+    Results are keyed by the origin and destination coordinates, in
+    order, and the costing model. Cached matrices are copied on the way
+    in and out, so callers are free to modify them.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of cached results.
+        """
+        self.maxsize = maxsize
+        self._results: OrderedDict[bytes, MatrixResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        origins: Sequence[tuple[float, float]] | np.ndarray,
+        destinations: Sequence[tuple[float, float]] | np.ndarray,
+        costing: str,
+    ) -> bytes:
+        """Build the cache key of a matrix request.
+
+        Coordinates are rounded to 6 decimal digits (about 0.1 m).
+
+        Args:
+            origins: Origin ``(latitude, longitude)`` points.
+            destinations: Destination ``(latitude, longitude)`` points.
+            costing: Costing model.
+
+        Returns: A short digest identifying the request.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for points in (origins, destinations):
+            coordinates = np.round(np.asarray(points, dtype=np.float64), 6)
+            digest.update(coordinates.tobytes())
+            digest.update(b"|")
+        digest.update(costing.encode())
+        return digest.digest()
+
+    def get(self, key: bytes) -> MatrixResult | None:
+        """Get a cached result.
+
+        Args:
+            key: Key of the request.
+
+        Returns: A copy of the cached result, or ``None`` if not cached.
+        """
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                return None
+            self._results.move_to_end(key)
+        return MatrixResult(result.time_matrix.copy(), result.distance_matrix.copy())
+
+    def put(self, key: bytes, result: MatrixResult):
+        """Cache a result, evicting the least recently used if full.
+
+        Args:
+            key: Key of the request.
+            result: Result of the request.
+        """
+        result = MatrixResult(result.time_matrix.copy(), result.distance_matrix.copy())
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+
+def coordinates_array(stops: Sequence["Coordinate"]) -> np.ndarray:
+    """Read the coordinates of stops into an array.
+
+    .. doctest::
+
+        >>> from pydantic_extra_types.coordinate import Coordinate
+        >>> from routeup.data.client.utils import coordinates_array
+        >>> coordinates_array([Coordinate(latitude=41.38, longitude=2.17)])
+        array([[41.38,  2.17]])
+
+    Args:
+        stops: List of stops.
 
-def slice_matrix(start_row, end_row, start_col, end_col, max_elements):
+    Returns: Array of shape ``(len(stops), 2)`` with the latitude and
+      longitude of each stop.
+    """
+    return np.array(
+        [(stop.latitude, stop.longitude) for stop in stops], dtype=np.float64
+    ).reshape(-1, 2)
+
+
+def concatenate(parts: Sequence[Sequence[T]]) -> list[T]:
+    """Concatenate sequences into a list allocated once.
+
+    .. doctest::
+
+        >>> from routeup.data.client.utils import concatenate
+        >>> concatenate([[1, 2], [3], []])
+        [1, 2, 3]
+
+    Args:
+        parts: Sequences to concatenate.
+
+    Returns: List with the items of every sequence, in order.
+    """
+    result: list = [None] * sum(len(part) for part in parts)
+    offset = 0
+    for part in parts:
+        result[offset : offset + len(part)] = part
+        offset += len(part)
+    return result
+
+
+def decode_polyline(encoded: str, precision: int) -> list[tuple[float, float]]:
+    """Decode an encoded polyline.
+
+    Args:
+        encoded: Encoded polyline.
+        precision: Number of decimal digits of the encoded coordinates.
+
+    Returns: List of ``(latitude, longitude)`` points.
+    """
+    if _decode_polyline is None:
+        return polyline.decode(encoded, precision=precision)
+    # pypolyline returns (longitude, latitude) points
+    return [(lat, lng) for lng, lat in _decode_polyline(encoded, precision)]
+
+
+def _tile_shape(n_rows: int, n_cols: int, max_elements: int) -> tuple[int, int]:
+    """Get the shape of the tiles slicing a matrix.
+
+    Tiles are as close to square as the matrix shape allows, with at
+    most ``max_elements`` elements each.
+
+    Args:
+        n_rows: Number of rows of the matrix.
+        n_cols: Number of columns of the matrix.
+        max_elements: Maximum number of elements in a tile.
+
+    Returns: Number of rows and columns of the tiles.
+    """
+    if n_rows * n_cols <= max_elements:
+        return max(1, n_rows), max(1, n_cols)
+    tile_rows = max(1, min(n_rows, math.isqrt(max_elements)))
+    tile_cols = max(1, min(n_cols, max_elements // tile_rows))
+    # Narrow matrices leave room for taller tiles
+    tile_rows = max(1, min(n_rows, max_elements // tile_cols))
+    return tile_rows, tile_cols
+
+
+def count_tiles(n_rows: int, n_cols: int, max_elements: int) -> int:
+    """Count the tiles :func:`slice_matrix` slices a matrix into.
+
+    .. doctest::
+
+        >>> from routeup.data.client.utils import count_tiles
+        >>> count_tiles(300, 300, 100)
+        900
+
+    Args:
+        n_rows: Number of rows of the matrix.
+        n_cols: Number of columns of the matrix.
+        max_elements: Maximum number of elements in a tile.
+
+    Returns: Number of tiles.
+    """
+    tile_rows, tile_cols = _tile_shape(n_rows, n_cols, max_elements)
+    return -(-n_rows // tile_rows) * -(-n_cols // tile_cols)
+
+
+def slice_matrix(
+    start_row: int, end_row: int, start_col: int, end_col: int, max_elements: int
+) -> Iterator[dict[str, int]]:
     """Slice a matrix into smaller matrices.
 
+    Tiles all have the same shape, worked out in closed form (see
+    :func:`count_tiles`), except for those at the bottom and right
+    edges. They are generated row by row.
+
     Args:
         start_row: Initial row index.
         end_row: Final row index.
         start_col: Initial column index.
         end_col: Final column index.
         max_elements: Maximum number of elements in the matrix.
+
+    Yields: Row and column ranges of each tile.
     """
-    dimension_1, dimension_2 = end_row - start_row, end_col - start_col
-    if (dimension_1 * dimension_2) <= max_elements:
-        return [
-            {
-                "start_row": start_row,
-                "end_row": end_row,
-                "start_col": start_col,
-                "end_col": end_col,
+    tile_rows, tile_cols = _tile_shape(
+        end_row - start_row, end_col - start_col, max_elements
+    )
+    for row in range(start_row, end_row, tile_rows):
+        for col in range(start_col, end_col, tile_cols):
+            yield {
+                "start_row": row,
+                "end_row": min(row + tile_rows, end_row),
+                "start_col": col,
+                "end_col": min(col + tile_cols, end_col),
             }
-        ]
-    else:
-        max_length = max(dimension_1, dimension_2)
-        new_length = max_length // 2
-        if dimension_1 == max_length:
-            top = slice_matrix(
-                start_row, start_row + new_length, start_col, end_col, max_elements
-            )
-            down = slice_matrix(
-                start_row + new_length, end_row, start_col, end_col, max_elements
-            )
-            return top + down
-        else:
-            left = slice_matrix(
-                start_row, end_row, start_col, start_col + new_length, max_elements
-            )
-            right = slice_matrix(
-                start_row, end_row, start_col + new_length, end_col, max_elements
-            )
-            return left + right
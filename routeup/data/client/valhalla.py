@@ -4,42 +4,102 @@
 # and is released under the MIT License Agreement.
 # See the LICENSE file for more information.
 #
-"""Valhalla client."""
+"""Valhalla client.
+
+Besides the synchronous API, the client has ``async`` counterparts of
+its requests built on ``httpx``, which is only needed (and imported)
+when they are used. They let many route requests run concurrently.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
 import numpy as np
-import polyline
 import requests
 from pydantic_extra_types.coordinate import Coordinate
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from routeup import schemas
 from routeup.core import config, logger
 from routeup.core.config import DistanceMetric
 from routeup.core.exceptions import InvalidResponseFormat
-from routeup.data.client.utils import MatrixResult
-from routeup.schemas.cartography import RequestStopValhalla
+from routeup.data.client.utils import (
+    MatrixCache,
+    MatrixResult,
+    concatenate,
+    coordinates_array,
+    decode_polyline,
+)
+
+if TYPE_CHECKING:
+    import httpx
 
 
 class ValhallaClient:
-    """Valhalla client."""
+    """Valhalla client.
+
+    Requests go through a persistent HTTP session, so connections to the
+    Valhalla server are kept alive and reused. The session can be closed
+    with :meth:`close`, or by using the client as a context manager.
+    """
 
     def __init__(
         self,
         base_url: str = "http://localhost:8002/",
+        timeout: tuple[float, float] = (3, 30),
+        max_workers: int = 16,
+        matrix_dtype: np.dtype = np.float32,
     ):
         """Valhalla client.
 
         Args:
             base_url (str): Valhalla API URL.
+            timeout (tuple[float, float]): Connect and read timeouts of the
+              API requests, in seconds.
+            max_workers (int): Maximum number of concurrent API requests.
+            matrix_dtype (np.dtype): Data type of the time/distance matrices.
 
         """
         self.__base_url = base_url
         self.__headers = {"Content-Type": "application/json"}
+        self.__timeout = timeout
+        self.max_workers = max_workers
+        self.matrix_dtype = matrix_dtype
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+                raise_on_status=False,
+            ),
+        )
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
         self._polyline_precision = 6  # six degrees of precision in valhalla
+        self._matrix_cache = MatrixCache()
         if config.DISTANCE_METRIC == DistanceMetric.METERS:
             self.distance_conversion_factor = 1000
         elif config.DISTANCE_METRIC == DistanceMetric.KILOMETERS:
             self.distance_conversion_factor = 1
         else:
             raise ValueError("Invalid distance metric")
+        self._scale_distances = self.distance_conversion_factor != 1
+
+    def close(self):
+        """Close the HTTP session of the client."""
+        self.__session.close()
+
+    def __enter__(self):
+        """Use the client as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the HTTP session when leaving the context."""
+        self.close()
 
     def __call_api_request(self, data: dict, service: str) -> dict | None:
         """Call Valhalla API and return JSON data.
@@ -51,85 +111,136 @@ class ValhallaClient:
         try:
             # Send API request
             url = self.__base_url + service
-            response = requests.get(url, headers=self.__headers, json=data)
-
-            # Check status code
-            if response.status_code == 200:
-                # Success! Do something with the data
-                logger.info(f"Successfully retrieved data from {service} API.")
-                return response.json()
-            else:
-                # Error! Log details and raise an exception
-                logger.error(
-                    f"API request failed with status code: {response.status_code}"
-                )
-                logger.error(f"Error message: {response.text}")
-                raise requests.exceptions.RequestException(
-                    "Valhalla API request failed. Check stop coordinates and costing mode."
-                )
+            response = self.__session.get(
+                url, headers=self.__headers, json=data, timeout=self.__timeout
+            )
+            return self.__read_response(response, service)
 
         except requests.exceptions.RequestException as e:
             # Handle other request errors
             logger.error(f"{e}")
             raise e
 
+    async def __acall_api_request(
+        self, client: "httpx.AsyncClient", data: dict, service: str
+    ) -> dict | None:
+        """Call Valhalla API asynchronously and return JSON data.
+
+        Args:
+            client (httpx.AsyncClient): Asynchronous HTTP client.
+            data (dict): API data.
+            service (str): API service.
+        """
+        import httpx
+
+        try:
+            # Send API request
+            url = self.__base_url + service
+            response = await client.request(
+                "GET", url, headers=self.__headers, json=data
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"{e}")
+            raise requests.exceptions.RequestException(str(e)) from e
+        return self.__read_response(response, service)
+
+    @staticmethod
+    def __read_response(response, service: str) -> dict:
+        """Read the JSON data of a Valhalla API response.
+
+        Args:
+            response: API response, from ``requests`` or ``httpx``.
+            service (str): API service.
+        """
+        # Check status code
+        if response.status_code == 200:
+            # Success! Do something with the data
+            logger.info(f"Successfully retrieved data from {service} API.")
+            return response.json()
+        else:
+            # Error! Log details and raise an exception
+            logger.error(f"API request failed with status code: {response.status_code}")
+            logger.error(f"Error message: {response.text}")
+            raise requests.exceptions.RequestException(
+                "Valhalla API request failed. Check stop coordinates and costing mode."
+            )
+
+    def _async_client(self) -> "httpx.AsyncClient":
+        """Create an asynchronous HTTP client for the Valhalla API.
+
+        The client pools up to ``max_workers`` connections, and is meant
+        to be shared by the requests of a batch.
+        """
+        import httpx
+
+        connect, read = self.__timeout
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=self.max_workers),
+        )
+
     def _parse_matrix_response(self, response: dict) -> MatrixResult:
         """Parses a matrix API response from Valhalla and returns distance and time matrices.
 
         Args:
             response (dict): The matrix API response in JSON format.
         """
-        # Check expected keys and data types
-        if not isinstance(response, dict):
-            raise InvalidResponseFormat("Response is not a dictionary.")
-        if "sources" not in response:
-            raise InvalidResponseFormat("sources' keys not found.")
-        if "targets" not in response:
-            raise InvalidResponseFormat("'targets' keys not found.")
-        if ("sources_to_targets" not in response) or (
-            not isinstance(response["sources_to_targets"], list)
-        ):
+        # Build distance and time matrices from response data, with NaN
+        # where data is missing. The response format is checked on the way.
+        try:
+            shape = (len(response["sources"]), len(response["targets"]))
+            sources_to_targets = response["sources_to_targets"]
+            distance_matrix = np.array(
+                [cell["distance"] for row in sources_to_targets for cell in row],
+                dtype=self.matrix_dtype,
+            ).reshape(shape)
+            time_matrix = np.array(
+                [cell["time"] for row in sources_to_targets for cell in row],
+                dtype=self.matrix_dtype,
+            ).reshape(shape)
+        except (KeyError, TypeError) as e:
+            raise InvalidResponseFormat(f"{e}") from e
+        except ValueError as e:
             raise InvalidResponseFormat(
-                "'sources_to_targets' key not found or not a list."
-            )
+                "'sources_to_targets' does not match sources and targets."
+            ) from e
+        if self._scale_distances:
+            distance_matrix *= self.distance_conversion_factor
+
+        # Calculate routes instead for missing data, concurrently
+        missing = np.argwhere(np.isnan(distance_matrix) | np.isnan(time_matrix))
+        if len(missing):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                routes = executor.map(
+                    lambda cell: self._get_missing_route(response, *cell), missing
+                )
+                for (i, j), route in zip(missing, routes):
+                    distance_matrix[i, j] = route.distances[0]
+                    time_matrix[i, j] = route.times[0]
+
+        return MatrixResult(time_matrix, distance_matrix)
 
-        # Create empty distance and time matrices
-        num_sources = len(response["sources"])
-        num_targets = len(response["targets"])
-        distance_matrix = np.zeros((num_sources, num_targets))
-        time_matrix = np.zeros((num_sources, num_targets))
+    def _get_missing_route(
+        self, response: dict, i: int, j: int
+    ) -> schemas.CartographyRoute:
+        """Get the route of a cell missing in a matrix API response.
 
-        # Fill distance and time matrices from response data
+        Args:
+            response (dict): The matrix API response in JSON format.
+            i (int): Source index of the cell.
+            j (int): Target index of the cell.
+        """
+        logger.warning(f"Missing matrix API data for source {i} and target {j}.")
+        logger.debug("Calculating route instead.")
         try:
-            for i, source_to_targets in enumerate(response["sources_to_targets"]):
-                for j, target_data in enumerate(source_to_targets):
-                    if (target_data["distance"] is None) or (
-                        target_data["time"] is None
-                    ):
-                        logger.warning(
-                            f"Missing matrix API data for source {i} and target {j}."
-                        )
-                        logger.debug("Calculating route instead.")
-                        start = Coordinate(
-                            latitude=response["sources"][i]["lat"],
-                            longitude=response["sources"][i]["lon"],
-                        )
-                        end = Coordinate(
-                            latitude=response["targets"][j]["lat"],
-                            longitude=response["targets"][j]["lon"],
-                        )
-                        route = self.get_route([start, end])
-                        distance_matrix[i, j] = route.distances[0]
-                        time_matrix[i, j] = route.times[0]
-                    else:
-                        distance_matrix[i, j] = (
-                            target_data["distance"] * self.distance_conversion_factor
-                        )
-                        time_matrix[i, j] = target_data["time"]
+            source, target = response["sources"][i], response["targets"][j]
+            locations = [
+                {"lat": source["lat"], "lon": source["lon"]},
+                {"lat": target["lat"], "lon": target["lon"]},
+            ]
         except KeyError as e:
             raise InvalidResponseFormat(f"{e}") from e
-
-        return MatrixResult(time_matrix, distance_matrix)
+        return self._get_route_raw(locations)
 
     def _parse_route_response(self, response: dict) -> schemas.CartographyRoute:
         """Parses a route API response from Valhalla and returns the route info.
@@ -147,37 +258,41 @@ class ValhallaClient:
         if not isinstance(response["trip"]["legs"], list):
             raise InvalidResponseFormat("'legs' key is not a list.")
 
-        coordinates, times, distances = [], [], []
-        n_legs = len(response["trip"]["legs"])
+        legs = response["trip"]["legs"]
         try:
-            for i in range(n_legs):
-                encoded_polyline = response["trip"]["legs"][i]["shape"]
-                coordinates += polyline.decode(
-                    encoded_polyline, precision=self._polyline_precision
-                )
-                times.append(response["trip"]["legs"][i]["summary"]["time"])
-                distances.append(
-                    response["trip"]["legs"][i]["summary"]["length"]
-                    * self.distance_conversion_factor
-                )
+            shapes = [
+                decode_polyline(leg["shape"], self._polyline_precision)
+                for leg in legs
+            ]
+            times = [leg["summary"]["time"] for leg in legs]
+            distances = [leg["summary"]["length"] for leg in legs]
+            if self._scale_distances:
+                distances = [
+                    distance * self.distance_conversion_factor
+                    for distance in distances
+                ]
         except KeyError as e:
             raise InvalidResponseFormat(f"{e}") from e
 
         return schemas.CartographyRoute(
-            coordinates=coordinates, times=times, distances=distances
+            coordinates=concatenate(shapes), times=times, distances=distances
         )
 
     @staticmethod
-    def _prepare_stops(stops: list[Coordinate]) -> list[dict]:
+    def _prepare_stops(stops: list[Coordinate] | np.ndarray) -> list[dict]:
         """Prepare stops for API request.
 
+        Stops are dumped straight to the
+        :class:`~routeup.schemas.cartography.RequestStopValhalla` format:
+        coordinates are already validated, so no model is built per stop.
+
         Args:
-            stops (list[Coordinate]): List of stops.
+            stops (list[Coordinate] | np.ndarray): List of stops, or array
+              with their latitudes and longitudes.
         """
-        return [
-            RequestStopValhalla(lat=stop.latitude, lon=stop.longitude).model_dump()
-            for stop in stops
-        ]
+        if isinstance(stops, np.ndarray):
+            return [{"lat": lat, "lon": lon} for lat, lon in stops.tolist()]
+        return [{"lat": stop.latitude, "lon": stop.longitude} for stop in stops]
 
     def get_matrix(self, stops: list[Coordinate], costing: str = None) -> MatrixResult:
         """Get time and distance matrix from Valhalla API from all stops to all stops.
@@ -186,15 +301,42 @@ class ValhallaClient:
             stops (list[Coordinate]): List of stops.
             costing (str): Costing model.
         """
+        key, matrix, data = self._prepare_matrix_request(stops, costing)
+        if matrix is not None:
+            return matrix
+        # Call API
+        response = self.__call_api_request(data, "sources_to_targets")
+        # Parse response
+        matrix = self._parse_matrix_response(response)
+        self._matrix_cache.put(key, matrix)
+        return matrix
+
+    def _prepare_matrix_request(
+        self, stops: list[Coordinate], costing: str = None
+    ) -> tuple[bytes, MatrixResult | None, dict | None]:
+        """Look for a matrix in the cache, or prepare its API request.
+
+        Args:
+            stops (list[Coordinate]): List of stops.
+            costing (str): Costing model.
+
+        Returns:
+            tuple[bytes, MatrixResult | None, dict | None]: The cache key of
+              the matrix, and either the cached matrix or the API request data.
+        """
         if costing is None:
             costing = "bus"
+        # Look for the matrix in the cache
+        points = coordinates_array(stops)
+        key = MatrixCache.key(points, points, costing)
+        matrix = self._matrix_cache.get(key)
+        if matrix is not None:
+            logger.debug("Matrix API result found in cache")
+            return key, matrix, None
         # Prepare API data
-        sources = self._prepare_stops(stops)
+        sources = self._prepare_stops(points)
         data = {"sources": sources, "targets": sources, "costing": costing}
-        # Call API
-        response = self.__call_api_request(data, "sources_to_targets")
-        # Parse response
-        return self._parse_matrix_response(response)
+        return key, None, data
 
     def get_route(
         self, stops: list[Coordinate], costing: str = None
@@ -205,11 +347,22 @@ class ValhallaClient:
             stops (list[Coordinate]): List of stops.
             costing (str): Costing model.
         """
+        return self._get_route_raw(self._prepare_stops(stops), costing)
+
+    def _get_route_raw(
+        self, locations: list[dict], costing: str = None
+    ) -> schemas.CartographyRoute:
+        """Get route from Valhalla API, for stops already prepared.
+
+        Args:
+            locations (list[dict]): List of stops, prepared for the API.
+            costing (str): Costing model.
+        """
         if costing is None:
             costing = "bus"
         # Prepare API data
         data = {
-            "locations": self._prepare_stops(stops),
+            "locations": locations,
             "costing": costing,
         }
 
@@ -217,3 +370,105 @@ class ValhallaClient:
         response = self.__call_api_request(data, "route")
         # Parse response
         return self._parse_route_response(response)
+
+    async def aget_matrix(
+        self,
+        stops: list[Coordinate],
+        costing: str = None,
+        *,
+        client: "httpx.AsyncClient | None" = None,
+    ) -> MatrixResult:
+        """Get time and distance matrix from Valhalla API, asynchronously.
+
+        Args:
+            stops (list[Coordinate]): List of stops.
+            costing (str): Costing model.
+            client (httpx.AsyncClient): Asynchronous HTTP client to use. A
+              new one is created for the request if not given.
+        """
+        key, matrix, data = self._prepare_matrix_request(stops, costing)
+        if matrix is not None:
+            return matrix
+        # Call API
+        if client is None:
+            async with self._async_client() as client:
+                response = await self.__acall_api_request(
+                    client, data, "sources_to_targets"
+                )
+        else:
+            response = await self.__acall_api_request(
+                client, data, "sources_to_targets"
+            )
+        # Parse response in a thread, as missing cells need route requests
+        matrix = await asyncio.to_thread(self._parse_matrix_response, response)
+        self._matrix_cache.put(key, matrix)
+        return matrix
+
+    async def aget_route(
+        self,
+        stops: list[Coordinate],
+        costing: str = None,
+        *,
+        client: "httpx.AsyncClient | None" = None,
+    ) -> schemas.CartographyRoute:
+        """Get route from Valhalla API, asynchronously.
+
+        Args:
+            stops (list[Coordinate]): List of stops.
+            costing (str): Costing model.
+            client (httpx.AsyncClient): Asynchronous HTTP client to use. A
+              new one is created for the request if not given.
+        """
+        if costing is None:
+            costing = "bus"
+        # Prepare API data
+        data = {
+            "locations": self._prepare_stops(stops),
+            "costing": costing,
+        }
+
+        # Call API
+        if client is None:
+            async with self._async_client() as client:
+                response = await self.__acall_api_request(client, data, "route")
+        else:
+            response = await self.__acall_api_request(client, data, "route")
+        # Parse response
+        return self._parse_route_response(response)
+
+    async def batch_get_routes(
+        self, stop_lists: list[list[Coordinate]], costing: str = None
+    ) -> list[schemas.CartographyRoute]:
+        """Get several routes from Valhalla API concurrently.
+
+        Args:
+            stop_lists (list[list[Coordinate]]): List of stops of each route.
+            costing (str): Costing model.
+
+        Returns: The routes, in the same order as ``stop_lists``.
+        """
+        async with self._async_client() as client:
+            return list(
+                await asyncio.gather(
+                    *(
+                        self.aget_route(stops, costing, client=client)
+                        for stops in stop_lists
+                    )
+                )
+            )
+
+    def get_routes(
+        self, stop_lists: list[list[Coordinate]], costing: str = None
+    ) -> list[schemas.CartographyRoute]:
+        """Get several routes from Valhalla API concurrently.
+
+        Synchronous wrapper of :meth:`batch_get_routes`, to be called from
+        outside an event loop.
+
+        Args:
+            stop_lists (list[list[Coordinate]]): List of stops of each route.
+            costing (str): Costing model.
+
+        Returns: The routes, in the same order as ``stop_lists``.
+        """
+        return asyncio.run(self.batch_get_routes(stop_lists, costing))
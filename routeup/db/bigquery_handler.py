@@ -4,8 +4,17 @@
 # and is released under the MIT License Agreement.
 # See the LICENSE file for more information.
 #
-"""BigQuery handler."""
+"""BigQuery handler.
+
+The BigQuery client, and the service account credentials it uses, are
+only loaded when a handler first needs them.
+
+Table existence checks reuse the dataset table listing for
+:data:`TABLES_CACHE_TTL` seconds.
+"""
+import time
 import warnings
+from functools import cache, cached_property
 from typing import List
 
 from google.cloud import bigquery
@@ -13,20 +22,24 @@ from google.oauth2 import service_account
 
 from routeup.core import config
 
-# ignore _CLOUD_SDK_CREDENTIALS_WARNING
-warnings.filterwarnings(action="ignore", category=UserWarning)
-#
-# bigquery_client = bigquery.Client(
-#     project=config.GCLOUD_PROJECT_ID,
-#     _http=AuthorizedSession(config.BIGQUERY_HTTP) if config.BIGQUERY_HTTP else None,
-# )
+TABLES_CACHE_TTL = 60
+"""Seconds during which a dataset table listing is reused."""
+
+
+@cache
+def _get_bigquery_client() -> bigquery.Client:
+    """Get the BigQuery client, created on the first call.
 
-credentials = service_account.Credentials.from_service_account_file(
-    filename=config.GCLOUD_CREDENTIALS_PATH
-)
-bigquery_client = bigquery.Client(
-    credentials=credentials, project=credentials.project_id
-)
+    Returns: BigQuery client authenticated with the service account of
+      :attr:`~routeup.core.config.GlobalConfig.GCLOUD_CREDENTIALS_PATH`.
+    """
+    with warnings.catch_warnings():
+        # ignore _CLOUD_SDK_CREDENTIALS_WARNING
+        warnings.simplefilter("ignore", UserWarning)
+        credentials = service_account.Credentials.from_service_account_file(
+            filename=config.GCLOUD_CREDENTIALS_PATH
+        )
+        return bigquery.Client(credentials=credentials, project=credentials.project_id)
 
 
 class BigQueryDataHandler:
@@ -41,10 +54,17 @@ class BigQueryDataHandler:
         """
         self.project_id = project_id
         self.dataset_id = dataset_id
-        self.client = bigquery_client
+        self._tables: frozenset[str] | None = None
+        self._tables_expiry = 0.0
+
+    @cached_property
+    def client(self) -> bigquery.Client:
+        """BigQuery client, shared by every handler."""
+        client = _get_bigquery_client()
         assert (
-            self.project_id == self.client.project
-        ), f"Project ID mismatch: {self.project_id}, {self.client.project}"
+            self.project_id == client.project
+        ), f"Project ID mismatch: {self.project_id}, {client.project}"
+        return client
 
     def list_tables(self) -> List:
         """List tables in dataset."""
@@ -57,10 +77,26 @@ class BigQueryDataHandler:
 
         return table_names
 
+    def table_names(self) -> frozenset[str]:
+        """Get the names of the tables in dataset, cached for a while.
+
+        The listing is reused for :data:`TABLES_CACHE_TTL` seconds, or
+        until :meth:`invalidate_cache` is called.
+        """
+        now = time.monotonic()
+        if self._tables is None or now >= self._tables_expiry:
+            self._tables = frozenset(self.list_tables())
+            self._tables_expiry = now + TABLES_CACHE_TTL
+        return self._tables
+
+    def invalidate_cache(self):
+        """Forget the cached table listing, e.g. after creating a table."""
+        self._tables = None
+
     def is_table_in_db(self, *, table_name: str) -> bool:
         """Check if table exists.
 
         Args:
             table_name (str): Table name.
         """
-        return table_name in self.list_tables()
+        return table_name in self.table_names()
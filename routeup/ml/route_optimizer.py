@@ -5,8 +5,13 @@
 # See the LICENSE file for more information.
 #
 """Route Optimizer Class."""
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import cached_property, partial
+
 import numpy as np
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+from ortools.constraint_solver.routing_parameters_pb2 import RoutingSearchParameters
 
 from routeup.core import config, logger
 from routeup.core.config.enums import RouteMode
@@ -28,6 +33,11 @@ class RouteOptimizer:
         *,
         route_optimizer_input: RouteOptimizerInput,
         vehicle_penalty: int = 10000,
+        first_solution_strategy: int = (
+            routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION
+        ),
+        extra_vehicles: int = 0,
+        extra_max_travel_time: int = 0,
     ) -> None:
         """Initialize the optimizer.
 
@@ -36,20 +46,69 @@ class RouteOptimizer:
         Args:
             route_optimizer_input: Input for the route optimizer.
             vehicle_penalty: Penalty for each vehicle. Defaults to 10000.
+            first_solution_strategy: ORTools heuristic building the first solution.
+                Defaults to PARALLEL_CHEAPEST_INSERTION, which handles the capacity
+                and time constraints better than PATH_CHEAPEST_ARC.
+            extra_vehicles: Extra vehicles added to the fleet, as in the grid
+                search. Defaults to 0.
+            extra_max_travel_time: Extra maximum travel time, as in the grid
+                search. Defaults to 0.
         """
+        self.route_optimizer_input = route_optimizer_input
         self.mode = route_optimizer_input.mode
-        self.time_matrix = np.array(route_optimizer_input.time_matrix)
         self.fleet = route_optimizer_input.fleet
         self.demands = route_optimizer_input.demands
         self.max_travel_time = route_optimizer_input.max_travel_time
         self.slack_time = route_optimizer_input.slack_time
+        self.time_matrix = self._prepare_time_matrix(route_optimizer_input.time_matrix)
+        # The fleet is fixed, so its capacities are shared by every data model.
+        n_types = len(self.fleet)
+        capacities = np.fromiter(
+            (item.capacity for item in self.fleet), dtype=np.int64, count=n_types
+        )
+        counts = np.fromiter(
+            (item.number_of_vehicles for item in self.fleet),
+            dtype=np.int64,
+            count=n_types,
+        )
+        self._base_capacities = np.repeat(capacities, counts)
+        self._max_capacity = int(self._base_capacities.max())
         self.vehicle_penalty = vehicle_penalty
-        self.data = self._create_data_model()
+        self.first_solution_strategy = first_solution_strategy
+        self.data = self._create_data_model(
+            extra_vehicles=extra_vehicles, extra_max_travel_time=extra_max_travel_time
+        )
         self.manager = self._set_manager()
         self.routing = self._set_routing(
             vehicle_penalty=self.vehicle_penalty, slack_time=self.slack_time
         )
 
+    def _prepare_time_matrix(self, time_matrix: list[list[int]]) -> np.ndarray:
+        """Turns the input time matrix into the one used by ORTools.
+
+        The depot row or column is adjusted once here, on a contiguous
+        integer copy of the input, so that every data model shares it.
+
+        Args:
+            time_matrix: Time matrix for distances between locations.
+
+        Returns:
+            np.ndarray: Integer time matrix with the depot adjustment applied.
+        """
+        time_matrix = np.array(time_matrix, dtype=np.int64)
+        # https://developers.google.com/optimization/routing/routing_tasks#allowing_arbitrary_start_and_end_locations:~:text=To%20set%20up%20the%20problem%20this%20way%2C%20simply%20modify%20the%20distance%20matrix%20so%20that%20distance%20from%20the%20depot%20to%20any%20other%20location%20is%200%2C%20by%20setting%20the%20first%20row%20and%20column%20of%20the%20matrix%20to%20have%20all%20zeros.%20This%20turns%20the%20depot%20into%20a%20dummy%20location%20that%20has%20no%20effect%20on%20the%20optimal%20routes.
+        if self.mode == RouteMode.INBOUND:
+            # inbound problem: the distance from the depot to any other location is 0
+            # set first row to -slack_time for starting from any point. Since going from the depot to anywhere  should
+            # take 0, we have to substract the slack_time to the time_matrix
+            time_matrix[0, :] = -self.slack_time
+        else:
+            # outbound problem: the distance from any location to the depot is 0
+            # set first column to -slack time for ending at any point. Since going from anywhere to the depot should
+            # take 0, we have to substract the slack_time to the time_matrix
+            time_matrix[:, 0] = -self.slack_time
+        return time_matrix
+
     def _create_data_model(
         self, *, extra_vehicles: int = 0, extra_max_travel_time: int = 0
     ) -> dict:
@@ -68,32 +127,21 @@ class RouteOptimizer:
             dict: A dictionary containing the preprocessed data model with the following keys:
                 - 'time_matrix': Time matrix for distances between locations. Should be in UNITS
                 - 'demands': Passangers to board the bus at each location.
-                - 'vehicle_capacities': List of vehicle capacities based on the fleet.
+                - 'vehicle_capacities': Array of vehicle capacities based on the fleet.
                 - 'num_vehicles': Total number of vehicles in the fleet.
                 - 'depot': Index representing the depot location.
                 - 'max_travel_time': Maximum travel time allowed for vehicles.
         """
-        time_matrix = self.time_matrix
-        # https://developers.google.com/optimization/routing/routing_tasks#allowing_arbitrary_start_and_end_locations:~:text=To%20set%20up%20the%20problem%20this%20way%2C%20simply%20modify%20the%20distance%20matrix%20so%20that%20distance%20from%20the%20depot%20to%20any%20other%20location%20is%200%2C%20by%20setting%20the%20first%20row%20and%20column%20of%20the%20matrix%20to%20have%20all%20zeros.%20This%20turns%20the%20depot%20into%20a%20dummy%20location%20that%20has%20no%20effect%20on%20the%20optimal%20routes.
-        if self.mode == RouteMode.INBOUND:
-            # inbound problem: the distance from the depot to any other location is 0
-            # set first row to -slack_time for starting from any point. Since going from the depot to anywhere  should
-            # take 0, we have to substract the slack_time to the time_matrix
-            time_matrix[0, :] = -self.slack_time
-        else:
-            # outbound problem: the distance from any location to the depot is 0
-            # set first column to -slack time for ending at any point. Since going from anywhere to the depot should
-            # take 0, we have to substract the slack_time to the time_matrix
-            time_matrix[:, 0] = -self.slack_time
-
-        vehicle_capacities = [
-            item.capacity for item in self.fleet for _ in range(item.number_of_vehicles)
-        ]
+        vehicle_capacities = self._base_capacities
 
         # Add extra vehicles of max_capacity
-
-        max_capacity = max(vehicle_capacities)  # Get the maximum capacity
-        vehicle_capacities.extend([max_capacity] * extra_vehicles)
+        if extra_vehicles > 0:
+            vehicle_capacities = np.concatenate(
+                [
+                    vehicle_capacities,
+                    np.full(extra_vehicles, self._max_capacity, dtype=np.int64),
+                ]
+            )
 
         data = {
             "time_matrix": self.time_matrix,
@@ -141,19 +189,19 @@ class RouteOptimizer:
             pywrapcp.RoutingModel: Configured routing model with constraints and defined system.
         """
         data = self.data
+        model_parameters = pywrapcp.DefaultRoutingModelParameters()
+        # Every vehicle shares the same arc cost, so their cost models are merged.
+        model_parameters.reduce_vehicle_cost_model = True
         # Create Routing Model.
-        routing = pywrapcp.RoutingModel(self.manager)
-
-        # Create and register a transit callback.
-        # The callback is used to compute the cost of traveling between two nodes.
-        def time_callback(from_index, to_index):
-            """Returns the distance between the two nodes."""
-            # Convert from routing variable Index to distance matrix NodeIndex.
-            from_node = self.manager.IndexToNode(from_index)
-            to_node = self.manager.IndexToNode(to_index)
-            return data["time_matrix"][from_node][to_node] + slack_time
-
-        transit_callback_index = routing.RegisterTransitCallback(time_callback)
+        routing = pywrapcp.RoutingModel(self.manager, model_parameters)
+
+        # Register the transit times between two nodes.
+        # They are used to compute the cost of traveling between two nodes.
+        # Registering them as a matrix keeps every lookup in the solver, without
+        # calling back into Python.
+        transit_callback_index = routing.RegisterTransitMatrix(
+            (data["time_matrix"] + slack_time).tolist()
+        )
 
         # We add a penalty for each vehicle used.
         for vehicles in range(data["num_vehicles"]):
@@ -162,13 +210,8 @@ class RouteOptimizer:
         # Define cost of each arc. Each unit of time adds a unit of penalty
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
-        # Add demand callback. It counts the amount of passangers each vehicle is carrying at any point of the route.
-        def demand_callback(from_index):
-            """Returns the demand of the node."""
-            from_node = self.manager.IndexToNode(from_index)
-            return data["demands"][from_node]
-
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        # Add demands. They count the amount of passangers each vehicle is carrying at any point of the route.
+        demand_callback_index = routing.RegisterUnaryTransitVector(data["demands"])
 
         # Add Capacity constraint. Vehicles cannot exceed their capacity.
         routing.AddDimensionWithVehicleCapacity(
@@ -190,6 +233,32 @@ class RouteOptimizer:
 
         return routing
 
+    @cached_property
+    def _search_parameters(self) -> RoutingSearchParameters:
+        """Default search parameters, with the first solution heuristic."""
+        # Setting first solution heuristic.
+        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+        search_parameters.first_solution_strategy = self.first_solution_strategy
+        return search_parameters
+
+    @cached_property
+    def _local_search_parameters(self) -> RoutingSearchParameters:
+        """Search parameters with the Guided Local Search metaheuristic."""
+        search_parameters = RoutingSearchParameters()
+        search_parameters.CopyFrom(self._search_parameters)
+        search_parameters.local_search_metaheuristic = (
+            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        )
+        return search_parameters
+
+    @cached_property
+    def _grid_search_parameters(self) -> RoutingSearchParameters:
+        """Search parameters limited to the grid search time limit."""
+        search_parameters = RoutingSearchParameters()
+        search_parameters.CopyFrom(self._search_parameters)
+        search_parameters.time_limit.seconds = config.APP_CONFIG.grid_search_time_limit
+        return search_parameters
+
     def optimizer_solver(
         self,
         *,
@@ -210,17 +279,12 @@ class RouteOptimizer:
         Returns:
             RouteOptimizerOutput: An object containing the optimization results.
         """
-        # Setting first solution heuristic.
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-        )
+        search_parameters = self._search_parameters
 
         # If local search is enabled, we use the Guided Local Search metaheuristic.
         if local_search:
-            search_parameters.local_search_metaheuristic = (
-                routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-            )
+            search_parameters = RoutingSearchParameters()
+            search_parameters.CopyFrom(self._local_search_parameters)
             search_parameters.time_limit.seconds = max_time
         # Solve the problem.
         solution = self.routing.SolveWithParameters(search_parameters)
@@ -245,14 +309,8 @@ class RouteOptimizer:
         """
         logger.info("Starting the grid search process.")
         logger.debug("Trying to solve the problem without grid search")
-        # Setting first solution heuristic.
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-        )
         # Solve the problem.
-        search_parameters.time_limit.seconds = config.APP_CONFIG.grid_search_time_limit
-        solution = self.routing.SolveWithParameters(search_parameters)
+        solution = self.routing.SolveWithParameters(self._grid_search_parameters)
 
         # Print solution on console.
         if solution:
@@ -284,59 +342,93 @@ class RouteOptimizer:
         data = self.data
         manager = self.manager
         routing = self.routing
+        demands = data["demands"]
+        time_dimension = routing.GetDimensionOrDie("Time")
+        # Methods called for every stop are bound once.
+        index_to_node = manager.IndexToNode
+        cumul_var = time_dimension.CumulVar
+        next_var = routing.NextVar
+        get_arc_cost = routing.GetArcCostForVehicle
+        is_end = routing.IsEnd
+        solution_min = solution.Min
+        solution_value = solution.Value
         routes = []
 
+        # Unused vehicles go straight from the depot to the end, so their single
+        # stop is known without walking the solution.
+        depot = data["depot"]
+        if self.mode == RouteMode.INBOUND:
+            unused_stop = RouteStop.model_construct(
+                stop_id=0, stop_demand=0, travel_time=0
+            )
+        else:
+            unused_stop = RouteStop.model_construct(
+                stop_id=depot, stop_demand=demands[depot], travel_time=0
+            )
+
+        # Values come from the solver and the validated input, so schemas are
+        # built without validation unless it is enabled in the configuration.
         for vehicle_id in range(data["num_vehicles"]):
             index = routing.Start(vehicle_id)
-            route_stops = []
-            route_time = 0
-            route_load = 0
-
-            while not routing.IsEnd(index):
-                node_index = manager.IndexToNode(index)
+            if is_end(solution_value(next_var(index))):
+                routes.append(
+                    Route.model_construct(
+                        vehicle_capacity=int(data["vehicle_capacities"][vehicle_id]),
+                        vehicle_travel_occupancy=demands[depot],
+                        vehicle_travel_time=0,
+                        route_stops=[unused_stop],
+                    )
+                )
+                continue
 
-                cumul_var = routing.GetDimensionOrDie("Time").CumulVar(index)
-                arrival_time = solution.Min(cumul_var)
+            nodes = []
+            arrival_times = []
+            route_time = 0
 
-                route_load += data["demands"][node_index]
+            while not is_end(index):
+                nodes.append(index_to_node(index))
+                arrival_times.append(solution_min(cumul_var(index)))
                 previous_index = index
-                index = solution.Value(routing.NextVar(index))
-                route_time += routing.GetArcCostForVehicle(
-                    previous_index, index, vehicle_id
-                )
-                route_stop = RouteStop(
+                index = solution_value(next_var(index))
+                route_time += get_arc_cost(previous_index, index, vehicle_id)
+
+            route_load = sum(demands[node_index] for node_index in nodes)
+            route_stops = [
+                RouteStop.model_construct(
                     stop_id=node_index,
-                    stop_demand=data["demands"][node_index],
+                    stop_demand=demands[node_index],
                     travel_time=arrival_time,
                 )
-                route_stops.append(route_stop)
+                for node_index, arrival_time in zip(nodes, arrival_times)
+            ]
 
             # If the vehicle has traveled, we added the vehicle penalty to the time, so we have to substract it to get
             # the real travel time
             if route_time > 0:
                 route_time -= self.vehicle_penalty
             if self.mode == RouteMode.INBOUND:
-                depot_stop = RouteStop(
+                depot_stop = RouteStop.model_construct(
                     stop_id=0,
                     stop_demand=0,
-                    vehicle_occupancy=route_load,
                     travel_time=route_time,
                 )
                 route_stops = route_stops[1:] + [depot_stop]
 
-            route = Route(
-                vehicle_capacity=data["vehicle_capacities"][vehicle_id],
+            route = Route.model_construct(
+                vehicle_capacity=int(data["vehicle_capacities"][vehicle_id]),
                 vehicle_travel_occupancy=route_load,
                 vehicle_travel_time=route_time,
                 route_stops=route_stops,
             )
             routes.append(route)
 
-        output = RouteOptimizerOutput(
+        output = RouteOptimizerOutput.model_construct(
             max_travel_time=data["max_travel_time"],
             routes=routes,
             slack_time=self.slack_time,
         )
+        if config.APP_CONFIG.validate_outputs:
+            return RouteOptimizerOutput.model_validate(output.model_dump())
         return output
 
     def _grid_search_solver(
@@ -347,6 +439,11 @@ class RouteOptimizer:
         This method configures and solves the routing problem using ORTools. It allows specifying
         whether to enable local search and sets a maximum time limit for the optimization.
 
+        Every candidate problem, with extra time or with extra vehicles, is independent
+        of the others, so they are solved in separate processes, at most one per CPU
+        so that each solver keeps a whole core within its time limit. Once a candidate
+        is solved, the larger candidates of its family still waiting are cancelled.
+
         Args:
             iter_max_extra_time: Maximum number of iterations to try with extra time. Defaults to 3.
             iter_max_extra_vehicle: Maximum number of iterations to try with extra vehicles. Defaults to 3.
@@ -354,78 +451,143 @@ class RouteOptimizer:
         Returns:
             RouteOptimizerOutput: An object containing the optimization results.
         """
+        n_candidates = iter_max_extra_time + iter_max_extra_vehicle
+        max_workers = max(1, min(n_candidates, os.cpu_count() or 1))
+        time_futures: list[Future] = []
+        vehicle_futures: list[Future] = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # The smallest candidates of both families are submitted first, so
+            # that they start first when there are fewer workers than candidates.
+            for i in range(1, max(iter_max_extra_time, iter_max_extra_vehicle) + 1):
+                if i <= iter_max_extra_time:
+                    logger.debug(
+                        f"Trying to solve the problem with {i} minutes more of "
+                        "extra time"
+                    )
+                    time_futures.append(
+                        executor.submit(
+                            _solve_candidate,
+                            self.route_optimizer_input,
+                            self.vehicle_penalty,
+                            self.first_solution_strategy,
+                            extra_vehicles=0,
+                            extra_max_travel_time=i * 60,
+                        )
+                    )
+                if i <= iter_max_extra_vehicle:
+                    logger.debug(f"Trying to solve the problem with {i} vehicle/s more")
+                    vehicle_futures.append(
+                        executor.submit(
+                            _solve_candidate,
+                            self.route_optimizer_input,
+                            self.vehicle_penalty,
+                            self.first_solution_strategy,
+                            extra_vehicles=i,
+                            extra_max_travel_time=0,
+                        )
+                    )
+            _cancel_larger_when_solved(time_futures)
+            _cancel_larger_when_solved(vehicle_futures)
+            # Only the smallest solvable candidate of each family is reported.
+            min_time = _smallest_solved(time_futures)
+            min_vehicles = _smallest_solved(vehicle_futures)
+
         message = []
         extra_time = 0
         extra_vehicles = Fleet(number_of_vehicles=0, capacity=0)
-        for i in range(1, iter_max_extra_time + 1):
-            logger.debug(
-                f"Trying to solve the problem with {i} minutes more of extra time"
-            )
-            self.data = self._create_data_model(
-                extra_vehicles=0, extra_max_travel_time=i * 60
-            )
-            self.manager = self._set_manager()
-            self.routing = self._set_routing(vehicle_penalty=self.vehicle_penalty)
-
-            # Setting first solution heuristic.
-            search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-            search_parameters.first_solution_strategy = (
-                routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        if min_time is not None:
+            extra_time = min_time * 60
+            message.append(
+                f"Solution can be found with {min_time} minutes more of extra time"
             )
-            search_parameters.time_limit.seconds = (
-                config.APP_CONFIG.grid_search_time_limit
+        if min_vehicles is not None:
+            extra_vehicles = Fleet(
+                number_of_vehicles=min_vehicles, capacity=self._max_capacity
             )
-            # Solve the problem.
-            solution = self.routing.SolveWithParameters(search_parameters)
-
-            # Print solution on console.
-            if solution:
-                extra_time = i * 60
-                message.append(
-                    f"Solution can be found with {i} minutes more of extra time"
-                )
-                break
-
-        for i in range(1, iter_max_extra_vehicle + 1):
-            logger.debug(f"Trying to solve the problem with {i} vehicle/s more")
-            self.data = self._create_data_model(
-                extra_vehicles=i, extra_max_travel_time=0
-            )
-            self.manager = self._set_manager()
-            self.routing = self._set_routing(vehicle_penalty=self.vehicle_penalty)
-
-            # Setting first solution heuristic.
-            search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-            search_parameters.first_solution_strategy = (
-                routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-            )
-            search_parameters.time_limit.seconds = (
-                config.APP_CONFIG.grid_search_time_limit
+            message.append(
+                f"Solution can be found with {min_vehicles} vehicle/s more \n"
             )
-            # Solve the problem.
-            solution = self.routing.SolveWithParameters(search_parameters)
-
-            # Print solution on console.
-            if solution:
-                vehicle_capacities = [
-                    item.capacity
-                    for item in self.fleet
-                    for _ in range(item.number_of_vehicles)
-                ]
-                extra_vehicles = Fleet(
-                    number_of_vehicles=i, capacity=max(vehicle_capacities)
-                )
-                message.append(f"Solution can be found with {i} vehicle/s more \n")
-                break
 
         if len(message) == 0:
             message.append("No solution found with extra vehicles or extra time.")
-        self.data = self._create_data_model(extra_vehicles=0, extra_max_travel_time=0)
-        self.manager = self._set_manager()
-        self.routing = self._set_routing(vehicle_penalty=self.vehicle_penalty)
 
         return GridSearchOutput(
             extra_time=extra_time,
             extra_vehicles=extra_vehicles,
             message=" or ".join(message),
         )
+
+
+def _solve_candidate(
+    route_optimizer_input: RouteOptimizerInput,
+    vehicle_penalty: int,
+    first_solution_strategy: int,
+    *,
+    extra_vehicles: int,
+    extra_max_travel_time: int,
+) -> bool:
+    """Check whether a grid search candidate problem can be solved.
+
+    It is defined at module level so that it can run in a worker process.
+
+    Args:
+        route_optimizer_input: Input for the route optimizer.
+        vehicle_penalty: Penalty for each vehicle.
+        first_solution_strategy: ORTools heuristic building the first solution.
+        extra_vehicles: Extra vehicles to be added.
+        extra_max_travel_time: Extra maximum travel time.
+
+    Returns:
+        bool: Whether a solution is found within the grid search time limit.
+    """
+    optimizer = RouteOptimizer(
+        route_optimizer_input=route_optimizer_input,
+        vehicle_penalty=vehicle_penalty,
+        first_solution_strategy=first_solution_strategy,
+        extra_vehicles=extra_vehicles,
+        extra_max_travel_time=extra_max_travel_time,
+    )
+    # Solve the problem.
+    solution = optimizer.routing.SolveWithParameters(optimizer._grid_search_parameters)
+    return bool(solution)
+
+
+def _cancel_larger_when_solved(futures: list[Future]):
+    """Cancel the larger candidates of a family once a smaller one is solved.
+
+    Only candidates still waiting for a worker are cancelled; running ones
+    are left to finish.
+
+    Args:
+        futures: Futures of the candidates of a family, from smallest to largest.
+    """
+    for i, future in enumerate(futures):
+        future.add_done_callback(partial(_cancel_if_solved, futures[i + 1 :]))
+
+
+def _cancel_if_solved(larger: list[Future], future: Future):
+    """Cancel the larger candidates if a candidate was solved.
+
+    Args:
+        larger: Futures of the larger candidates of the family.
+        future: Done future of the candidate.
+    """
+    if not future.cancelled() and future.exception() is None and future.result():
+        for other in larger:
+            other.cancel()
+
+
+def _smallest_solved(futures: list[Future]) -> int | None:
+    """Get the smallest solved candidate of a family.
+
+    Candidates are waited for in order, so cancelled candidates, which are
+    larger than a solved one, are never reached.
+
+    Args:
+        futures: Futures of the candidates of a family, from smallest to largest.
+
+    Returns:
+        int | None: The 1-based position of the smallest solved candidate, or
+            None if no candidate is solved.
+    """
+    return next((i for i, f in enumerate(futures, start=1) if f.result()), None)
@@ -32,8 +32,7 @@ And then use it in other schema modules:
 
 """
 
-from pydantic import BaseModel
-from pydantic_settings import SettingsConfigDict
+from pydantic import BaseModel, ConfigDict
 
 
 class BaseSchema(BaseModel):
@@ -51,12 +50,23 @@ class BaseSchema(BaseModel):
       If a schema has non-hashable fields, you need to override this
       configuration to set ``frozen = False``.
 
+    * ``revalidate_instances="never"`` so that schema instances nested in
+      another schema, such as the stops of a route, are not validated
+      again. A schema receiving instances built without validation, for
+      instance with ``model_construct``, from untrusted input needs to
+      override this configuration.
+
+    * ``hide_input_in_errors=True`` so that validation errors do not
+      render the, potentially large, invalid input.
+
     """
 
-    """Custom schema configuration class."""
-    model_config = SettingsConfigDict(
+    model_config = ConfigDict(
         frozen=True,  # Make subclasses hashable.
         from_attributes=True,  # Enable SQLAlchemy compatibility.
+        revalidate_instances="never",  # Trust already built schemas.
+        validate_assignment=False,  # Frozen schemas are never assigned.
+        hide_input_in_errors=True,  # Keep validation errors short.
     )
 
 
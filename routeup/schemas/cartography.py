@@ -23,7 +23,7 @@ class CartographyRoute(BaseSchema):
     @field_validator("times", "distances")
     def no_null_values(cls, value: list[float]) -> list[float]:
         """Ensures no null values exist in the list."""
-        if any(np.isnan(val) for val in value):
+        if np.isnan(np.asarray(value, dtype=np.float64)).any():
             raise ValueError("Values in the list cannot be null.")
         return value
 
@@ -11,10 +11,10 @@ within this package.
 
 """
 
-from pandera import SchemaModel
+from pandera import DataFrameModel
 
 
-class BaseDFSchema(SchemaModel):
+class BaseDFSchema(DataFrameModel):
     """Base dataframe schema.
 
     Every Pandera dataframe schema inherits this base, and therefore
@@ -29,5 +29,9 @@ class BaseDFSchema(SchemaModel):
         """Coerce types when possible instead of raising a validation
         error."""
 
+        strict = "filter"
+        """Drop columns that are not in the schema instead of keeping
+        them unvalidated."""
+
 
 __all__ = ["BaseDFSchema"]
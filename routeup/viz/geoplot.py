@@ -17,32 +17,99 @@
     >>> mymap.save("mymap.html")
 """
 
-import folium
+import math
+
 import numpy as np
-from pydantic_extra_types.coordinate import Coordinate, Latitude, Longitude
+from folium import (
+    Element,
+    FeatureGroup,
+    Icon,
+    Map,
+    Marker,
+    PolyLine,
+    RegularPolygonMarker,
+    TileLayer,
+)
+from folium.plugins import FastMarkerCluster, PolyLineTextPath
+from pydantic_extra_types.coordinate import Coordinate
 
 _DEFAULT_BBOX = [(24, 0.6), (44, 2.3)]
 
+_ARROW_TEXT = "  \u25b6  "
+"""Text repeated along polylines to show their direction."""
+
+_CLUSTER_CALLBACK = """
+    function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]));
+        marker.setIcon(
+            L.AwesomeMarkers.icon({markerColor: row[3], icon: row[4], prefix: row[5]})
+        );
+        if (row[2]) {
+            marker.bindTooltip(row[2]);
+        }
+        return marker;
+    }"""
+"""JavaScript building a clustered marker from its latitude, longitude, text,
+color, icon and icon prefix."""
+
+_LEGEND_HEADER = """
+            <div style="position: fixed; bottom: 50px; left: 50px; z-index:9999; font-size: 14px; background-color:white; padding: 20px; border: 2px solid grey; width: 200px;">
+            """
+"""Opening HTML of the polyline legend."""
+
+_LEGEND_ROW = """
+                <div style="display: flex; align-items: center; margin-top: 10px;">
+                    <svg height="20" width="20">
+                        <line x1="0" y1="10" x2="20" y2="10" style="stroke:{color};stroke-width:3" />
+                    </svg>
+                    <p style="margin-left: 10px;">{name}</p>
+                </div>
+                """
+"""HTML template of a polyline legend row, formatted with its color and name."""
+
+_LEGEND_FOOTER = """
+            </div>
+            """
+"""Closing HTML of the polyline legend."""
+
 
 class GeoPlot:
     """Class to handle folium plots."""
 
-    def __init__(self, bbox: list[tuple[float, float]] | None = None, **kwds):
+    def __init__(
+        self,
+        bbox: list[tuple[float, float]] | None = None,
+        tiles: str | None = "OpenStreetMap",
+        **kwds,
+    ):
         """Constructor.
 
         Args:
             bbox: bounding box of the map
-            **kwds: any other parameter for the folium.Map
+            tiles: tiles of the map. With ``None``, the map has no tile layer
+                and no tiles are requested when it is opened, until one is
+                attached with :meth:`attach_tiles`.
+            **kwds: any other parameter for the folium.Map. Vectors are drawn
+                on a single canvas unless ``prefer_canvas=False`` is given.
         """
         bounds = _DEFAULT_BBOX if bbox is None else bbox
-        self.gpmap = folium.Map(**kwds)
+        kwds = {"prefer_canvas": True, **kwds}
+        self._prefer_canvas = bool(kwds["prefer_canvas"])
+        self.gpmap = Map(tiles=tiles, **kwds)
         self.gpmap.fit_bounds(bounds=bounds)
+        self._icons: dict[tuple[str, str, str | None], Icon] = {}
+        self._rendered: str | None = None
+        self._cluster: FastMarkerCluster | None = None
 
     def _get_icon(
         self, *, color: str, icon: str, prefix: str | None = None
-    ) -> folium.Icon:
+    ) -> Icon:
         """Get the icon.
 
+        Icons are cached by style in each map, so that markers looking the
+        same share a single icon. They are not shared between maps, as an
+        icon is only rendered in the map it was last added to.
+
         Args:
             color: color of the icon.
             icon: name of the icon.
@@ -51,13 +118,50 @@ class GeoPlot:
         Returns:
             The folium.Icon object
         """
-        if prefix is None:
-            return folium.Icon(
-                color=color,
-                icon=icon,
+        key = (color, icon, prefix)
+        if key not in self._icons:
+            if prefix is None:
+                self._icons[key] = Icon(
+                    color=color,
+                    icon=icon,
+                )
+            else:
+                self._icons[key] = Icon(color=color, prefix=prefix, icon=icon)
+        return self._icons[key]
+
+    def _add_to_cluster(
+        self,
+        lats: list[float],
+        lons: list[float],
+        texts: list[str],
+        *,
+        color: str,
+        icon: str,
+        prefix: str | None,
+    ):
+        """Add points to the marker cluster of the map.
+
+        The cluster is created on first use. Its points are serialized as a
+        single JSON array, and their markers are built by the browser.
+
+        Args:
+            lats: latitudes of the points
+            lons: longitudes of the points
+            texts: plain or html texts to appear on mouseover, one per point
+            color: color of the points
+            icon: The name of the marker sign ('ok', 'info', 'car', ...)
+            prefix: depends on the assume icons
+        """
+        if self._cluster is None:
+            self._cluster = FastMarkerCluster(
+                data=[], callback=_CLUSTER_CALLBACK, control=False
             )
-        else:
-            return folium.Icon(color=color, prefix=prefix, icon=icon)
+            self._cluster.add_to(self.gpmap)
+        prefix = "glyphicon" if prefix is None else prefix
+        self._cluster.data.extend(
+            [lat, lon, f"{text}", color, icon, prefix]
+            for lat, lon, text in zip(lats, lons, texts)
+        )
 
     def plot_point(
         self,
@@ -67,6 +171,7 @@ class GeoPlot:
         text: str = "",
         icon: str = "ok",
         prefix: str | None = None,
+        cluster: bool = False,
     ):
         """Add point on the gpmap.
 
@@ -76,18 +181,81 @@ class GeoPlot:
             text: plain or html text to appear on mouseover
             icon: The name of the marker sign ('ok', 'info', 'car', ...)
             prefix: depends on the assume icons
+            cluster: whether to add the point to the marker cluster of the
+                map, which keeps the map light with many points.
         """
-        folium.Marker(
+        self._rendered = None
+        if cluster:
+            self._add_to_cluster(
+                [point.latitude],
+                [point.longitude],
+                [text],
+                color=color,
+                icon=icon,
+                prefix=prefix,
+            )
+            return
+        Marker(
             location=[point.latitude, point.longitude],
             icon=self._get_icon(color=color, icon=icon, prefix=prefix),
             tooltip=f"{text}",
         ).add_to(self.gpmap)
 
     def plot_points(
-        self, points: list[Coordinate], *, color: str = "blue", icon: str = "ok", **kwds
+        self,
+        lats: np.ndarray | list[Coordinate],
+        lons: np.ndarray | None = None,
+        *,
+        color: str = "blue",
+        icon: str = "ok",
+        texts: list[str] | None = None,
+        prefix: str | None = None,
+        cluster: bool = False,
     ):
-        """Add points on the gpmap."""
-        raise NotImplementedError
+        """Add points on the gpmap.
+
+        Every point shares the same icon, and their markers are grouped
+        in a single layer added to the map at once. Clustered points are
+        instead serialized as a single JSON array, so that the size of the
+        map grows with the coordinates only, not with a marker per point.
+
+        Args:
+            lats: latitudes of the points, or the points themselves if
+                ``lons`` is not given.
+            lons: longitudes of the points.
+            color: color of the points
+            icon: The name of the marker sign ('ok', 'info', 'car', ...)
+            texts: plain or html texts to appear on mouseover, one per point
+            prefix: depends on the assume icons
+            cluster: whether to add the points to the marker cluster of the
+                map.
+        """
+        self._rendered = None
+        if lons is None:
+            lats, lons = np.array(
+                [(point.latitude, point.longitude) for point in lats],
+                dtype=np.float64,
+            ).reshape(-1, 2).T
+        if texts is None:
+            texts = [""] * len(lats)
+        if cluster:
+            self._add_to_cluster(
+                np.asarray(lats).tolist(),
+                np.asarray(lons).tolist(),
+                texts,
+                color=color,
+                icon=icon,
+                prefix=prefix,
+            )
+            return
+        shared_icon = self._get_icon(color=color, icon=icon, prefix=prefix)
+        feature_group = FeatureGroup(control=False)
+        add = feature_group.add_child
+        for lat, lon, text in zip(
+            np.asarray(lats).tolist(), np.asarray(lons).tolist(), texts
+        ):
+            add(Marker(location=(lat, lon), icon=shared_icon, tooltip=f"{text}"))
+        feature_group.add_to(self.gpmap)
 
     def plot_polyline(
         self,
@@ -96,64 +264,112 @@ class GeoPlot:
         color: str = "lightred",
         with_arrows: bool = False,
     ):
-        """Add polyline on the gpmap."""
-        folium.PolyLine(points, color=color, opacity=0.9).add_to(self.gpmap)
+        """Add polyline on the gpmap.
+
+        On maps drawn as SVG, arrows are repeated along the polyline as a
+        text path, which the browser draws with the polyline itself. Text
+        paths need SVG, so on canvas maps arrow heads are markers, one in
+        the middle of each segment, computed for the whole polyline at once
+        and grouped in a single layer.
+        Polylines with less than two points are not drawn.
+        """
+        if len(points) < 2:
+            return
+        self._rendered = None
+        polyline = PolyLine(points, color=color, opacity=0.9).add_to(
+            self.gpmap
+        )
         if with_arrows:
-            for i, point in enumerate(points[:-1]):
-                arrow = self._get_arrows(
-                    point1=Coordinate(
-                        latitude=Latitude(point[0]), longitude=Longitude(point[1])
-                    ),
-                    point2=Coordinate(
-                        latitude=Latitude(points[i + 1][0]),
-                        longitude=Longitude(points[i + 1][1]),
-                    ),
-                    color=color,
-                    size=10,
+            if not self._prefer_canvas:
+                PolyLineTextPath(
+                    polyline,
+                    _ARROW_TEXT,
+                    repeat=True,
+                    offset=7,
+                    attributes={"fill": color, "font-size": "14"},
+                ).add_to(self.gpmap)
+                return
+            lats, lons = np.asarray(points, dtype=np.float64).T
+            # Subtracting 90 degrees to account for the head's orientation
+            rotations = self._get_bearings(lats=lats, lons=lons).astype(int) - 90
+            mid_lats = lats[:-1] + 0.5 * np.diff(lats)
+            mid_lons = lons[:-1] + 0.5 * np.diff(lons)
+            arrow_options = {
+                "fill_color": color,
+                "color": color,
+                "number_of_sides": 3,
+                "radius": 10,
+                "opacity": 0.7,
+            }
+            arrows = FeatureGroup(control=False)
+            add = arrows.add_child
+            for location, rotation in zip(
+                zip(mid_lats.tolist(), mid_lons.tolist()), rotations.tolist()
+            ):
+                add(
+                    RegularPolygonMarker(
+                        location=location, rotation=rotation, **arrow_options
+                    )
                 )
-                arrow.add_to(self.gpmap)
+            arrows.add_to(self.gpmap)
         # Define a custom legend
 
-    def _get_bearing(self, *, point1: Coordinate, point2: Coordinate) -> float:
+    @staticmethod
+    def _get_bearings(*, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Returns compass bearings between consecutive points.
+
+        It is the vectorized version of :meth:`_get_bearing`.
+
+        Args:
+            lats: Latitudes of the points.
+            lons: Longitudes of the points.
+
+        Returns:
+          compass bearings with orientation north, one per segment
+        """
+        lat_mid = np.radians(lats[:-1] + 0.5 * np.diff(lats))
+        x = np.diff(lons) * np.cos(lat_mid)
+        y = np.diff(lats)
+        # adjusting for compass bearing
+        return np.degrees(np.arctan2(x, y)) % 360
+
+    @staticmethod
+    def _get_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Returns compass bearing from point p1 to p2.
 
-        See Also:
-             https://gist.github.com/jeromer/2005586
+        The bearing is computed on a flat earth, scaling longitudes by the
+        cosine of the middle latitude. On city scale routes it is well
+        within the degree of precision the arrow heads are drawn with.
 
         Args:
-            point1: Point 1 (from)
-            point2: Point 2 (towards)
+            lat1: Latitude of point 1 (from)
+            lon1: Longitude of point 1 (from)
+            lat2: Latitude of point 2 (towards)
+            lon2: Longitude of point 2 (towards)
 
         Returns:
           compass bearing with orientation north
         """
-        lon_diff = np.radians(point2.longitude - point1.longitude)
-        lat1 = np.radians(point1.latitude)
-        lat2 = np.radians(point2.latitude)
-        x = np.sin(lon_diff) * np.cos(lat2)
-        y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon_diff)
-        bearing = np.degrees(np.arctan2(x, y))
-
+        lat_mid = math.radians(0.5 * (lat1 + lat2))
+        x = (lon2 - lon1) * math.cos(lat_mid)
+        y = lat2 - lat1
         # adjusting for compass bearing
-        if bearing < 0:
-            bearing = bearing + 360
-
-        return bearing
+        return math.degrees(math.atan2(x, y)) % 360
 
     def _get_arrows(
         self,
+        point1: tuple[float, float],
+        point2: tuple[float, float],
         *,
-        point1: Coordinate,
-        point2: Coordinate,
         color: str = "gray",
         size: int = 6,
         n_arrows: int = 1,
-    ) -> folium.RegularPolygonMarker:
+    ) -> list[RegularPolygonMarker]:
         """Get a list of arrows to be plotted between the points.
 
         Args:
-            point1: Point 1 (from)
-            point2: Point 2 (towards)
+            point1: Latitude and longitude of point 1 (from)
+            point2: Latitude and longitude of point 2 (towards)
             color: the color of the arrow head
             size: The size of the arrow head value is 6
             n_arrows: number of arrows to create. Default value is 3
@@ -161,24 +377,22 @@ class GeoPlot:
         Returns:
             A list of folium.RegularPolygonMarker to be plotted
         """
+        lat1, lon1 = point1
+        lat2, lon2 = point2
         # Getting the rotation needed for the arrow head.
         # Subtracting 90 degrees to account for the head's orientation
-        rotation = int(self._get_bearing(point1=point1, point2=point2)) - 90
+        rotation = int(self._get_bearing(lat1, lon1, lat2, lon2)) - 90
 
         # Get the middle of an evenly spaced list of latitudes and
         # longitudes for the arrows.
-        arrow_lats = np.linspace(point1.latitude, point2.latitude, n_arrows + 2)[
-            1 : (n_arrows + 1)
-        ]
-        arrow_lons = np.linspace(point1.longitude, point2.longitude, n_arrows + 2)[
-            1 : (n_arrows + 1)
-        ]
+        arrow_lats = np.linspace(lat1, lat2, n_arrows + 2)[1 : (n_arrows + 1)]
+        arrow_lons = np.linspace(lon1, lon2, n_arrows + 2)[1 : (n_arrows + 1)]
         arrows = []
 
         # appending the arrows heads to a list
         for points in zip(arrow_lats, arrow_lons):
             arrows.append(
-                folium.RegularPolygonMarker(
+                RegularPolygonMarker(
                     location=points,
                     fill_color=color,
                     color=color,
@@ -188,7 +402,30 @@ class GeoPlot:
                     rotation=rotation,
                 )
             )
-        return arrows[0]
+        return arrows
+
+    def attach_tiles(self, tiles: str = "OpenStreetMap"):
+        """Add a tile layer to the map.
+
+        Args:
+            tiles: name or URL template of the tiles.
+        """
+        self._rendered = None
+        TileLayer(tiles).add_to(self.gpmap)
+
+    def render(self) -> str:
+        """Render the map to HTML.
+
+        The rendered map is kept until a point, polyline or legend is
+        added, so that saving it again does not render every element
+        again. Changes made directly on ``gpmap`` are not tracked.
+
+        Returns:
+            The HTML of the map.
+        """
+        if self._rendered is None:
+            self._rendered = self.gpmap.get_root().render()
+        return self._rendered
 
     def save(self, filename: str):
         """Save the map to a file.
@@ -196,7 +433,8 @@ class GeoPlot:
         Args:
             filename: File name and format to save the map.
         """
-        self.gpmap.save(filename)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(self.render())
 
     def add_polyline_legend(self, elements: list[dict]):
         """Add a legend to the map.
@@ -204,23 +442,11 @@ class GeoPlot:
         Args:
             elements: List of dictionaries with the color and name of the polyline.
         """
-        legend_html = """
-            <div style="position: fixed; bottom: 50px; left: 50px; z-index:9999; font-size: 14px; background-color:white; padding: 20px; border: 2px solid grey; width: 200px;">
-            """
-
+        self._rendered = None
+        parts = [_LEGEND_HEADER]
         for polyline in elements:
-            color = polyline["color"]
-            name = polyline["name"]
-            legend_html += f"""
-                <div style="display: flex; align-items: center; margin-top: 10px;">
-                    <svg height="20" width="20">
-                        <line x1="0" y1="10" x2="20" y2="10" style="stroke:{color};stroke-width:3" />
-                    </svg>
-                    <p style="margin-left: 10px;">{name}</p>
-                </div>
-                """
-
-        legend_html += """
-            </div>
-            """
-        self.gpmap.get_root().html.add_child(folium.Element(legend_html))
+            parts.append(
+                _LEGEND_ROW.format(color=polyline["color"], name=polyline["name"])
+            )
+        parts.append(_LEGEND_FOOTER)
+        self.gpmap.get_root().html.add_child(Element("".join(parts)))
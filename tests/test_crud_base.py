@@ -0,0 +1,76 @@
+#
+# Copyright (c) 2024 by Dribia Data Research.
+# This file is part of project RouteUp,
+# and is released under the MIT License Agreement.
+# See the LICENSE file for more information.
+#
+"""Tests of the CRUD base class."""
+
+import pytest
+from pandera.typing import Series
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from routeup.crud.base import CRUDBase
+from routeup.models import BaseModel
+from routeup.schemas.base import BaseSchema
+from routeup.schemas_df.base import BaseDFSchema
+
+
+class DefaultedTable(BaseModel):
+    """Table with columns defaulted on the Python and the server sides."""
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+    status: Mapped[str | None] = mapped_column(default="new")
+    origin: Mapped[str | None] = mapped_column(server_default=text("'app'"))
+
+
+class DefaultedSchema(BaseSchema):
+    """Row of the defaulted table, leaving the defaulted columns unset."""
+
+    name: str
+    status: str | None = None
+    origin: str | None = None
+
+
+class DefaultedDFSchema(BaseDFSchema):
+    """Defaulted table."""
+
+    name: Series[str]
+
+
+class CRUDDefaulted(
+    CRUDBase[DefaultedTable, DefaultedSchema, DefaultedSchema, DefaultedDFSchema]
+):
+    """CRUD of the defaulted table."""
+
+    __slots__ = ()
+
+
+@pytest.fixture
+def db():
+    """Session on an in-memory SQLite database with the defaulted table."""
+    engine = create_engine("sqlite://")
+    DefaultedTable.metadata.create_all(engine, tables=[DefaultedTable.__table__])
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_create_multi_applies_column_defaults_like_create(db):
+    """Unset columns get their defaults both with create and create_multi."""
+    crud = CRUDDefaulted(DefaultedTable, DefaultedDFSchema)
+    crud.create(db, obj_in=DefaultedSchema(name="single"))
+    crud.create_multi(
+        db,
+        data=[DefaultedSchema(name="multi"), DefaultedSchema(name="other")],
+    )
+    rows = db.execute(
+        select(DefaultedTable.name, DefaultedTable.status, DefaultedTable.origin)
+    ).all()
+    assert sorted(rows) == [
+        ("multi", "new", "app"),
+        ("other", "new", "app"),
+        ("single", "new", "app"),
+    ]
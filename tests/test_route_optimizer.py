@@ -0,0 +1,81 @@
+#
+# Copyright (c) 2024 by Dribia Data Research.
+# This file is part of project RouteUp,
+# and is released under the MIT License Agreement.
+# See the LICENSE file for more information.
+#
+"""Regression tests of the route optimizer."""
+
+import pytest
+from ortools.constraint_solver import routing_enums_pb2
+
+from routeup.core.config.enums import RouteMode
+from routeup.ml.route_optimizer import RouteOptimizer
+from routeup.schemas.route_optimizer import RouteOptimizerInput
+
+TIME_MATRIX = [
+    [0, 300, 420, 540, 360, 480],
+    [300, 0, 180, 300, 240, 360],
+    [420, 180, 0, 150, 330, 270],
+    [540, 300, 150, 0, 390, 210],
+    [360, 240, 330, 390, 0, 200],
+    [480, 360, 270, 210, 200, 0],
+]
+"""Travel times between the depot (node 0) and five stops."""
+
+DEMANDS = [0, 2, 1, 2, 1, 2]
+"""Passengers at each node."""
+
+
+def _route(occupancy: int, travel_time: int, stops: list[tuple[int, int]]) -> dict:
+    """Dumped route of a vehicle of capacity 4, from its (stop, time) pairs."""
+    return {
+        "vehicle_capacity": 4,
+        "vehicle_travel_occupancy": occupancy,
+        "vehicle_travel_time": travel_time,
+        "route_stops": [
+            {"stop_id": stop, "stop_demand": DEMANDS[stop], "travel_time": time}
+            for stop, time in stops
+        ],
+    }
+
+
+EXPECTED_ROUTES = {
+    RouteMode.INBOUND: [
+        _route(0, 0, [(0, 0)]),
+        _route(2, 420, [(1, 0), (0, 420)]),
+        _route(3, 810, [(3, 0), (2, 270), (0, 810)]),
+        _route(3, 800, [(5, 0), (4, 320), (0, 800)]),
+    ],
+    RouteMode.OUTBOUND: [
+        _route(0, 0, [(0, 0)]),
+        _route(3, 810, [(0, 0), (2, 540), (3, 810)]),
+        _route(3, 800, [(0, 0), (4, 480), (5, 800)]),
+        _route(2, 420, [(0, 0), (1, 420)]),
+    ],
+}
+"""Routes found with the path cheapest arc strategy, one vehicle unused."""
+
+
+@pytest.mark.parametrize("mode", [RouteMode.INBOUND, RouteMode.OUTBOUND])
+def test_optimizer_solver_output_is_unchanged(mode):
+    """The optimizer finds the same routes on a fixed problem."""
+    route_optimizer_input = RouteOptimizerInput(
+        mode=mode,
+        fleet=[{"number_of_vehicles": 4, "capacity": 4}],
+        time_matrix=TIME_MATRIX,
+        demands=DEMANDS,
+        max_travel_time=900,
+        slack_time=120,
+    )
+    optimizer = RouteOptimizer(
+        route_optimizer_input=route_optimizer_input,
+        first_solution_strategy=(
+            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        ),
+    )
+    assert optimizer.optimizer_solver().model_dump() == {
+        "max_travel_time": 900,
+        "slack_time": 120,
+        "routes": EXPECTED_ROUTES[mode],
+    }